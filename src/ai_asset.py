@@ -1,15 +1,28 @@
 # File: src/ai_asset.py
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import pygame
 
 class DynamicAssetGenerator:
     """
     A simple AI agent to select dynamic background assets based on game parameters.
+
+    Scaled backgrounds are kept in a cache keyed by (file, screen_size), converted to
+    the display format and bounded to cache_bytes of pixel data. Whenever a background
+    is loaded, the one for the next score bracket is decoded and scaled on a
+    background thread, so switching to it doesn't stall the game loop.
     """
 
-    def __init__(self, asset_folder="assets/backgrounds"):
+    def __init__(self, asset_folder="assets/backgrounds", cache_bytes=32 * 1024 * 1024):
         self.asset_folder = asset_folder
         self.backgrounds = self.load_backgrounds()
+        self.cache_bytes = cache_bytes
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.pending = {}
+        self.executor = None
 
     def load_backgrounds(self):
         """
@@ -41,16 +54,75 @@ class DynamicAssetGenerator:
     def load_background(self, game_params, screen_size=(800, 600)):
         """
         Loads and returns a pygame surface for the background image.
+        Served from the cache (or a finished prefetch) when possible, and schedules
+        a prefetch of the next score bracket's background.
         """
         bg_file = self.pick_background(game_params)
         if bg_file and os.path.exists(bg_file):
-            try:
-                background_img = pygame.image.load(bg_file)
-                # Scale the image to fit the screen
-                background_img = pygame.transform.scale(background_img, screen_size)
-                return background_img
-            except Exception as e:
-                print("Error loading background image:", bg_file, e)
-                return None
+            key = (bg_file, tuple(screen_size))
+            background_img = self.cache.get(key)
+            if background_img is not None:
+                self.cache.move_to_end(key)
+            else:
+                future = self.pending.pop(key, None)
+                try:
+                    if future is not None:
+                        background_img = future.result()
+                    else:
+                        background_img = self.decode_background(bg_file, screen_size)
+                except Exception as e:
+                    print("Error loading background image:", bg_file, e)
+                    return None
+                self.store(key, background_img)
+            next_score = (game_params.get("score", 0) // 200 + 1) * 200
+            self.prefetch(dict(game_params, score=next_score), screen_size)
+            return background_img
         else:
             return None
+
+    def decode_background(self, bg_file, screen_size):
+        """
+        Decodes a background image, scales it to fit the screen and converts it to the
+        display's pixel format (when a display is set). Safe to call from a worker thread.
+        """
+        background_img = pygame.image.load(bg_file)
+        # Scale the image to fit the screen
+        background_img = pygame.transform.scale(background_img, screen_size)
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            background_img = background_img.convert()
+        return background_img
+
+    def prefetch(self, game_params, screen_size=(800, 600)):
+        """
+        Starts decoding the background for game_params on a background thread,
+        unless it is already cached or being prefetched.
+        """
+        bg_file = self.pick_background(game_params)
+        if not bg_file or not os.path.exists(bg_file):
+            return
+        key = (bg_file, tuple(screen_size))
+        if key in self.cache or key in self.pending:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="background-prefetch")
+        self.pending[key] = self.executor.submit(self.decode_background, bg_file, tuple(screen_size))
+
+    def store(self, key, surface):
+        """
+        Adds a surface to the cache, evicting the least recently used backgrounds
+        until the cache fits within cache_bytes (the newest one is always kept).
+        """
+        self.cache[key] = surface
+        self.cached_bytes += surface.get_bytesize() * surface.get_width() * surface.get_height()
+        while self.cached_bytes > self.cache_bytes and len(self.cache) > 1:
+            _, evicted = self.cache.popitem(last=False)
+            self.cached_bytes -= evicted.get_bytesize() * evicted.get_width() * evicted.get_height()
+
+    def shutdown(self):
+        """
+        Stops the prefetch thread and drops pending prefetches.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        self.pending.clear()
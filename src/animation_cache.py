@@ -0,0 +1,105 @@
+# File: src/animation_cache.py
+from collections import OrderedDict
+
+import pygame
+
+class AnimationCache:
+    """
+    A process-wide cache of sliced and scaled animation frames.
+
+    Frames are keyed by (path, frame_count, scale, flip), so every Player and
+    Enemy that uses the same sprite sheet shares a single decoded copy.
+    Least recently used entries are evicted once max_entries is exceeded.
+
+    If pack is set to an AssetPack, frames baked into it are used instead of
+    decoding, scaling and flipping the sprite sheet.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pack = None
+
+    def get(self, path, frame_count, scale, flip=False, fallback_color=(255, 0, 0)):
+        """
+        Returns the list of frames for the given sprite sheet, loading it on a miss.
+        The returned list is shared between callers and must not be modified.
+        """
+        key = (path, frame_count, tuple(scale), flip)
+        frames = self.entries.get(key)
+        if frames is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return frames
+
+        self.misses += 1
+        if self.pack is not None:
+            frames = self.pack.frames(path, frame_count, scale, flip)
+        if frames is None:
+            if flip:
+                # Build flipped frames from the (cached) unflipped ones.
+                frames = [pygame.transform.flip(frame, True, False)
+                          for frame in self.get(path, frame_count, scale, False, fallback_color)]
+            else:
+                frames = self.load_frames(path, frame_count, scale, fallback_color)
+        self.entries[key] = frames
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return frames
+
+    def load_frames(self, path, frame_count, scale, fallback_color):
+        """
+        Loads a sprite sheet from the given path and slices it into frame_count frames.
+        Each frame is then scaled to the desired size.
+        """
+        frames = []
+        try:
+            sheet = pygame.image.load(path).convert_alpha()
+        except Exception as e:
+            print(f"Error loading animation from {path}: {e}")
+            fallback = pygame.Surface(scale)
+            fallback.fill(fallback_color)
+            return [fallback]
+
+        sheet_width, sheet_height = sheet.get_size()
+        frame_width = sheet_width // frame_count
+        for i in range(frame_count):
+            frame_rect = (i * frame_width, 0, frame_width, sheet_height)
+            frame = sheet.subsurface(frame_rect)
+            # Scale the frame to the desired size.
+            frame = pygame.transform.scale(frame, scale)
+            frames.append(frame)
+        return frames
+
+    def stats(self):
+        """
+        Returns a dictionary with the cache's hit/miss counters and current size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+        }
+
+    def clear(self):
+        """
+        Drops every cached animation and resets the counters.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+# Shared instance used by Player and Enemy.
+animation_cache = AnimationCache()
+
+def load_animation(path, frame_count, scale, flip=False, fallback_color=(255, 0, 0)):
+    """
+    Convenience wrapper around the shared animation cache.
+    """
+    return animation_cache.get(path, frame_count, scale, flip, fallback_color)
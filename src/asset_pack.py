@@ -0,0 +1,163 @@
+# File: src/asset_pack.py
+import argparse
+import mmap
+import os
+import struct
+import time
+
+import pygame
+
+# File layout (all little-endian):
+#   header:  magic, format version, reserved, entry count
+#   index:   one entry per animation: name length, frame count, frame width, frame
+#            height, flipped, padding, source file size, offset of the first frame,
+#            followed by the name (the sprite sheet path relative to the resource
+#            base, UTF-8, with "/" separators)
+#   frames:  raw pixels, BGRA (the byte order of convert_alpha() surfaces), each
+#            animation's frames stored back to back
+MAGIC = b"CPAP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+ENTRY = struct.Struct("<HHHHB3xIQ")
+PIXEL_FORMAT = "BGRA"
+
+def write_pack(path, animations, base_path):
+    """
+    Writes animations, a mapping of (sheet path, frame_count, scale, flip) -> frames
+    like AnimationCache.entries, to path. Animations whose sheet doesn't exist (the
+    fallback frames) are left out.
+    """
+    entries = []
+    for (sheet_path, frame_count, scale, flip), frames in animations.items():
+        if not os.path.exists(sheet_path):
+            continue
+        name = os.path.relpath(sheet_path, base_path).replace(os.sep, "/").encode("utf-8")
+        pixels = b"".join(pygame.image.tobytes(frame, PIXEL_FORMAT) for frame in frames)
+        entries.append((name, frame_count, scale, flip, os.path.getsize(sheet_path), pixels))
+
+    offset = HEADER.size + sum(ENTRY.size + len(name) for name, *_ in entries)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(entries)))
+        for name, frame_count, (width, height), flip, source_size, pixels in entries:
+            f.write(ENTRY.pack(len(name), frame_count, width, height, flip, source_size, offset))
+            f.write(name)
+            offset += len(pixels)
+        for *_, pixels in entries:
+            f.write(pixels)
+    return len(entries)
+
+class AssetPack:
+    """
+    A pack of pre-decoded, pre-scaled animation frames, memory-mapped for reading.
+
+    frames() wraps the mapped pixels in surfaces with pygame.image.frombuffer, so
+    nothing is decoded, scaled, flipped or copied at load time. The surfaces keep
+    referencing the mapping, so the pack has to stay open while they are in use.
+    Animations whose sprite sheet changed size since the pack was baked are treated
+    as missing, so a stale pack falls back to loading the PNGs.
+    """
+
+    def __init__(self, path, base_path):
+        self.file = open(path, "rb")
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.buffer)
+        magic, version, _, count = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an asset pack")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{path} has unsupported asset pack version {version}")
+
+        # (sheet path, frame_count, scale, flip) -> (source size, offset)
+        self.index = {}
+        position = HEADER.size
+        for _ in range(count):
+            name_length, frame_count, width, height, flip, source_size, offset = ENTRY.unpack_from(self.buffer, position)
+            position += ENTRY.size
+            name = bytes(self.view[position:position + name_length]).decode("utf-8")
+            position += name_length
+            if offset + frame_count * width * height * 4 > len(self.buffer):
+                self.close()
+                raise ValueError(f"{path} is truncated")
+            sheet_path = os.path.normpath(os.path.join(base_path, *name.split("/")))
+            self.index[(sheet_path, frame_count, (width, height), bool(flip))] = (source_size, offset)
+
+    def __len__(self):
+        return len(self.index)
+
+    def frames(self, path, frame_count, scale, flip=False):
+        """
+        Returns the frames of an animation as surfaces over the mapped pixels, or
+        None if the pack doesn't have it (or its sprite sheet changed since baking).
+        """
+        entry = self.index.get((os.path.normpath(path), frame_count, tuple(scale), flip))
+        if entry is None:
+            return None
+        source_size, offset = entry
+        try:
+            if os.path.getsize(path) != source_size:
+                return None
+        except OSError:
+            # The sheets don't have to ship alongside the pack.
+            pass
+        width, height = scale
+        frame_bytes = width * height * 4
+        return [pygame.image.frombuffer(self.view[start:start + frame_bytes], (width, height), PIXEL_FORMAT)
+                for start in range(offset, offset + frame_count * frame_bytes, frame_bytes)]
+
+    def close(self):
+        """
+        Closes the pack. Only possible once no surface from frames() is alive.
+        """
+        self.view.release()
+        self.buffer.close()
+        self.file.close()
+
+def open_pack(path, base_path):
+    """
+    Opens the asset pack at path, returning None if there isn't a usable one.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return AssetPack(path, base_path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Error loading asset pack {path}: {e}")
+        return None
+
+def bake(path, base_path):
+    """
+    Loads every Player and Enemy animation (both facings) from the PNG sprite sheets
+    and writes them to an asset pack at path. Returns the number of animations written.
+    """
+    # Imported here so the game can import this module without the sprite classes.
+    from animation_cache import animation_cache
+    from player import Player
+    from enemy import Enemy
+
+    pack = animation_cache.pack
+    animation_cache.pack = None
+    animation_cache.clear()
+    try:
+        Player(0, 0)
+        Enemy(0, 0)
+        return write_pack(path, animation_cache.entries, base_path)
+    finally:
+        animation_cache.clear()
+        animation_cache.pack = pack
+
+if __name__ == "__main__":
+    from simulation import init_headless
+    from settings import ASSET_PACK
+
+    parser = argparse.ArgumentParser(description="Bake the sprite animations into an asset pack. "
+                                                 "Run it again whenever a sprite sheet changes.")
+    parser.add_argument("--output", default=ASSET_PACK)
+    args = parser.parse_args()
+
+    init_headless()
+    start = time.perf_counter()
+    count = bake(args.output, os.path.abspath("."))
+    elapsed = time.perf_counter() - start
+    print(f"Baked {count} animations into {args.output} ({os.path.getsize(args.output)} bytes, {elapsed:.2f}s)")
@@ -0,0 +1,462 @@
+# File: src/benchmarks.py
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+import pygame
+
+from simulation import init_headless, GameSimulation
+from platform import Platform
+from enemy import Enemy
+from collectible import Collectible
+from player import Player
+from spatial_hash import SpatialHash
+from renderer import Renderer, RESOLUTION_STEPS
+from level_baker import BakedLevel
+from level_generator import LevelGenerator
+from sprite_pool import SpritePool
+from animation_cache import animation_cache
+from ai_asset import DynamicAssetGenerator
+from text_cache import render_text
+from settings import LEVEL_HEIGHT, GROUND_Y, SCREEN_WIDTH, SCREEN_HEIGHT, TICK_RATE
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+
+# Run in a fresh interpreter by bench_first_frame: loads the player's and an enemy's
+# animations (from the asset pack given as argv[2], if any), draws and presents
+# one frame, and prints the milliseconds spent loading animations and the
+# milliseconds since the script started.
+FIRST_FRAME_SCRIPT = """
+import time
+start = time.perf_counter()
+import os, sys
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, sys.argv[1])
+import pygame
+pygame.display.init()
+screen = pygame.display.set_mode((800, 600))
+from animation_cache import animation_cache
+from asset_pack import open_pack
+if len(sys.argv) > 2:
+    animation_cache.pack = open_pack(sys.argv[2], os.path.abspath("."))
+from player import Player
+from enemy import Enemy
+load_start = time.perf_counter()
+player = Player(100, 100)
+enemy = Enemy(300, 100)
+load_ms = (time.perf_counter() - load_start) * 1000
+screen.fill((100, 150, 200))
+screen.blit(player.image, player.rect)
+screen.blit(enemy.image, enemy.rect)
+pygame.display.flip()
+print(load_ms, (time.perf_counter() - start) * 1000)
+"""
+
+def measure(func, repeat=100):
+    """
+    Calls func repeat times and returns the mean time per call in milliseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def build_world(num_entities, level_width, level_height, seed=0):
+    """
+    Scatters num_entities platforms, enemies and collectibles (in a 2:2:1 ratio)
+    over a level of the given size. Returns (player, platforms, enemies, collectibles).
+    """
+    rng = random.Random(seed)
+    platforms = pygame.sprite.Group()
+    enemies = pygame.sprite.Group()
+    collectibles = pygame.sprite.Group()
+    for i in range(num_entities):
+        x = rng.randint(0, level_width - 200)
+        y = rng.randint(50, level_height - 50)
+        kind = i % 5
+        if kind < 2:
+            platforms.add(Platform(x, y, rng.randint(100, 200), 20))
+        elif kind < 4:
+            enemies.add(Enemy(x, y, patrol_distance=rng.randint(50, 100), speed=rng.choice([1, 2])))
+        else:
+            collectibles.add(Collectible(x, y))
+    player = Player(level_width // 2, level_height // 2)
+    return player, platforms, enemies, collectibles
+
+def bench_collisions(num_entities=10000, level_width=100000, level_height=1200, repeat=100):
+    """
+    Times one frame of collision checks (platforms, enemy hitboxes and collectibles)
+    done with linear pygame.sprite.spritecollide scans versus the spatial hash, the
+    latter including whatever upkeep keeps the hash current as enemies move. The
+    enemies move between frames (untimed); moving them is timed on its own.
+    """
+    player, platforms, enemies, collectibles = build_world(num_entities, level_width, level_height)
+
+    def linear_frame():
+        pygame.sprite.spritecollide(player, platforms, False)
+        pygame.sprite.spritecollide(player, enemies, False,
+                                    collided=lambda p, e: p.rect.colliderect(e.hitbox))
+        pygame.sprite.spritecollide(player, collectibles, False)
+
+    platform_hash = SpatialHash()
+    platform_hash.add(platforms)
+    # As in GameSimulation: filed by patrol area, so moving enemies needs no upkeep.
+    enemy_hash = SpatialHash(rect_attr="patrol_rect", collide_attr="hitbox")
+    enemy_hash.add(enemies)
+    collectible_hash = SpatialHash()
+    collectible_hash.add(collectibles)
+
+    def hash_frame():
+        platform_hash.collide(player)
+        enemy_hash.collide(player)
+        collectible_hash.collide(player)
+
+    # The animation clock, advanced a tick per call.
+    now = [0]
+
+    def move_enemies():
+        now[0] += 1000 // TICK_RATE
+        for enemy in enemies:
+            enemy.update(now[0])
+
+    def moving(frame):
+        # Times frame alone, with the enemies a tick further along each call.
+        elapsed = 0.0
+        for _ in range(repeat):
+            move_enemies()
+            start = time.perf_counter()
+            frame()
+            elapsed += time.perf_counter() - start
+        return elapsed * 1000 / repeat
+
+    return {
+        "entities": num_entities,
+        "linear_ms": moving(linear_frame),
+        "hash_ms": moving(hash_frame),
+        "enemy_move_ms": measure(move_enemies, repeat),
+    }
+
+def bench_generation(sizes=(10, 100, 1000, 10000, 100000), level_sizes=(10, 100, 1000), seed=0):
+    """
+    Times LevelGenerator.generate_layout as num_platforms grows, with the level
+    widened to keep roughly 16 pixels per platform. Growth should be close to
+    linear, so time per platform should stay roughly flat. generate_level, which
+    also builds the sprites, is timed for level_sizes.
+    """
+    result = {}
+    for num_platforms in sizes:
+        generator = LevelGenerator(max(1600, num_platforms * 16), LEVEL_HEIGHT, GROUND_Y,
+                                   num_platforms=num_platforms, seed=seed)
+        # Small levels are repeated, so they take long enough to time reliably.
+        elapsed_ms = measure(generator.generate_layout, repeat=max(1, 2000 // num_platforms))
+        result[f"ms_{num_platforms}"] = elapsed_ms
+        result[f"us_per_platform_{num_platforms}"] = elapsed_ms * 1000 / num_platforms
+    for num_platforms in level_sizes:
+        generator = LevelGenerator(max(1600, num_platforms * 16), LEVEL_HEIGHT, GROUND_Y,
+                                   num_platforms=num_platforms, seed=seed)
+        result[f"level_ms_{num_platforms}"] = measure(generator.generate_level, repeat=max(1, 2000 // num_platforms))
+    return result
+
+def bench_load_animation(repeat=20):
+    """
+    Times Player.load_animation and Enemy.load_animation for all of their
+    animations (both facings), decoding the sprite sheets (cache cleared, no asset
+    pack) and from the warm animation cache.
+    """
+    player = Player(0, 0)
+    enemy = Enemy(0, 0)
+    pack = animation_cache.pack
+    animation_cache.pack = None
+
+    def load_all(sprite):
+        for anim, frame_count in sprite.animation_specs.items():
+            path = os.path.join("assets", type(sprite).__name__.lower(), f"{anim}.png")
+            sprite.load_animation(path, frame_count, sprite.scale)
+            sprite.load_animation(path, frame_count, sprite.scale, flip=True)
+
+    def cold(sprite):
+        animation_cache.clear()
+        load_all(sprite)
+
+    try:
+        result = {
+            "player_cold_ms": measure(lambda: cold(player), repeat),
+            "enemy_cold_ms": measure(lambda: cold(enemy), repeat),
+        }
+        result["player_warm_ms"] = measure(lambda: load_all(player), repeat)
+        load_all(enemy)
+        result["enemy_warm_ms"] = measure(lambda: load_all(enemy), repeat)
+    finally:
+        animation_cache.clear()
+        animation_cache.pack = pack
+    return result
+
+def bench_first_frame(repeat=5):
+    """
+    Times a fresh process from its first statement to presenting its first frame with
+    the sprites loaded, decoding the PNG sprite sheets versus mapping a baked asset
+    pack. Also reports the part of that spent loading animations, and each process's
+    total wall time. Best of repeat runs.
+    """
+    def run(*args):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", FIRST_FRAME_SCRIPT, SRC_DIR, *args], cwd=ROOT_DIR,
+                                check=True, capture_output=True, text=True).stdout
+        load_ms, first_frame_ms = output.split()[-2:]
+        return float(load_ms), float(first_frame_ms), (time.perf_counter() - start) * 1000
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pack_path = os.path.join(temp_dir, "animations.pack")
+        subprocess.run([sys.executable, os.path.join(SRC_DIR, "asset_pack.py"), "--output", pack_path],
+                       cwd=ROOT_DIR, check=True, capture_output=True)
+        png = [run() for _ in range(repeat)]
+        pack = [run(pack_path) for _ in range(repeat)]
+    return {
+        "png_load_ms": min(load for load, _, _ in png),
+        "pack_load_ms": min(load for load, _, _ in pack),
+        "png_first_frame_ms": min(first for _, first, _ in png),
+        "pack_first_frame_ms": min(first for _, first, _ in pack),
+        "png_process_ms": min(total for _, _, total in png),
+        "pack_process_ms": min(total for _, _, total in pack),
+    }
+
+def bench_restart(num_platforms=1000, repeat=20, seed=0):
+    """
+    Times restarting a level (building a GameSimulation from a pre-generated layout)
+    with fresh sprites versus sprites recycled through a SpritePool, and the time
+    the garbage collector spends in those restarts. As in run_game, every restart
+    is onto a new layout (seed, seed + 1, ...); retrying the same layout, where
+    every recycled sprite keeps its size, is timed separately as the best case.
+    """
+    level_width = max(1600, num_platforms * 16)
+    layouts = [LevelGenerator(level_width, LEVEL_HEIGHT, GROUND_Y, num_platforms=num_platforms,
+                              seed=seed + i).generate_layout() for i in range(repeat + 1)]
+    gc_time = [0.0]
+    gc_start = [0.0]
+
+    def on_gc(phase, info):
+        if phase == "start":
+            gc_start[0] = time.perf_counter()
+        else:
+            gc_time[0] += time.perf_counter() - gc_start[0]
+
+    def timed(restart):
+        gc.collect()
+        gc_time[0] = 0.0
+        gc.callbacks.append(on_gc)
+        try:
+            elapsed_ms = measure(restart, repeat)
+        finally:
+            gc.callbacks.remove(on_gc)
+        return elapsed_ms, gc_time[0] * 1000 / repeat
+
+    sims = []
+    restarts = [0]
+
+    def next_layout():
+        restarts[0] += 1
+        return layouts[restarts[0] % len(layouts)]
+
+    def fresh_restart():
+        sims[:] = [GameSimulation(seed=seed, layout=next_layout(), level_width=level_width)]
+
+    pool = SpritePool()
+
+    def pooled_restart():
+        pool.release_all()
+        sims[:] = [GameSimulation(seed=seed, layout=next_layout(), level_width=level_width, pool=pool)]
+
+    def pooled_retry():
+        pool.release_all()
+        sims[:] = [GameSimulation(seed=seed, layout=layouts[0], level_width=level_width, pool=pool)]
+
+    fresh_ms, fresh_gc_ms = timed(fresh_restart)
+    pooled_restart()
+    pooled_ms, pooled_gc_ms = timed(pooled_restart)
+    pooled_retry()
+    retry_ms, retry_gc_ms = timed(pooled_retry)
+    return {
+        "platforms": num_platforms,
+        "fresh_ms": fresh_ms,
+        "pooled_ms": pooled_ms,
+        "pooled_retry_ms": retry_ms,
+        "fresh_gc_ms": fresh_gc_ms,
+        "pooled_gc_ms": pooled_gc_ms,
+        "pooled_retry_gc_ms": retry_gc_ms,
+    }
+
+def bench_render_scale(num_platforms=200, repeat=100, seed=0, screen_size=(800, 600)):
+    """
+    Times drawing one frame of a generated level (full redraw, like a scrolling
+    camera) at each render scale in RESOLUTION_STEPS.
+    """
+    level_width = max(1600, num_platforms * 16)
+    sim = GameSimulation(seed=seed, num_platforms=num_platforms, level_width=level_width)
+    camera = types.SimpleNamespace(camera_rect=pygame.Rect((0, sim.ground_y - screen_size[1] + 100), screen_size))
+    static_layer = BakedLevel(sim.platform_sprites)
+    screen = pygame.Surface(screen_size)
+    result = {}
+    for scale in RESOLUTION_STEPS:
+        renderer = Renderer([sim.enemy_index, sim.collectible_hash], always_drawn=[sim.player],
+                            static_layers=[static_layer], render_scale=scale)
+        renderer.draw(screen, camera)
+        result[f"scale_{scale}_ms"] = measure(lambda: renderer.draw(screen, camera), repeat)
+    return result
+
+def bench_frame(sizes=(10, 200, 2000), frames=300, seed=0):
+    """
+    Times one frame of the run_game loop (a simulation tick with random input, the
+    camera, the HUD text and a full-resolution render into an offscreen screen) on
+    generated levels of each size, averaged over frames frames of play. Also reports
+    the mean number of sprites drawn (visible_<size>) out of those indexed
+    (total_<size>) and the static layer chunks blitted (chunks_<size>) per frame.
+    """
+    # Imported here as main sets up the whole game's imports.
+    from main import Camera
+    from simulation import random_inputs
+    pygame.font.init()
+    font = pygame.font.Font(None, 24)
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    result = {}
+    for num_platforms in sizes:
+        level_width = max(1600, num_platforms * 16)
+        sim = GameSimulation(seed=seed, inputs=random_inputs(seed, 0.1), num_platforms=num_platforms,
+                             level_width=level_width)
+        camera = Camera(sim.level_width, sim.level_height)
+        renderer = Renderer([sim.enemy_index, sim.collectible_hash], always_drawn=[sim.player],
+                            static_layers=[BakedLevel(sim.platform_sprites)])
+        # Sprites drawn, sprites indexed and chunks blitted, summed over the timed frames.
+        counts = [0, 0, 0]
+
+        def frame():
+            sim.step()
+            camera.update(sim.player)
+            overlays = [(render_text(font, f"HP: {sim.player.health}", (255, 255, 255)), (10, 10)),
+                        (render_text(font, f"Collectibles: {sim.collected}/{sim.total_collectibles}",
+                                     (255, 255, 255)), (100, 10))]
+            renderer.draw(screen, camera, overlays)
+            counts[0] += renderer.visible_count
+            counts[1] += renderer.total_count
+            counts[2] += renderer.chunk_count
+
+        frame()
+        counts[:] = [0, 0, 0]
+        result[f"ms_{num_platforms}"] = measure(frame, frames)
+        result[f"visible_{num_platforms}"] = counts[0] / frames
+        result[f"total_{num_platforms}"] = counts[1] / frames
+        result[f"chunks_{num_platforms}"] = counts[2] / frames
+    return result
+
+def bench_background(repeat=10, screen_size=(SCREEN_WIDTH, SCREEN_HEIGHT)):
+    """
+    Times DynamicAssetGenerator.load_background decoding and scaling a background
+    (a new generator each time, so nothing is cached) and serving it from the cache.
+    """
+    assets = DynamicAssetGenerator()
+    if not assets.backgrounds:
+        return {"backgrounds": 0}
+    params = {"score": 0}
+
+    def cold():
+        generator = DynamicAssetGenerator()
+        generator.load_background(params, screen_size)
+        if generator.executor is not None:
+            # Don't let the prefetch of the next background run into the next call.
+            generator.executor.shutdown(wait=True)
+
+    assets.load_background(params, screen_size)
+    return {
+        "backgrounds": len(assets.backgrounds),
+        "cold_ms": measure(cold, repeat),
+        "cached_ms": measure(lambda: assets.load_background(params, screen_size), repeat * 100),
+    }
+
+def timing_keys(result):
+    """
+    Returns the keys of a benchmark result that hold timings (milliseconds or microseconds).
+    """
+    return [key for key, value in result.items()
+            if isinstance(value, float) and (key.endswith("_ms") or key.startswith(("ms_", "us_", "level_ms_")))]
+
+def compare(results, baseline, threshold, min_ms=0.01):
+    """
+    Compares results against baseline results (both {benchmark: result}), returning
+    (benchmark, key, baseline value, value, ratio) for every timing more than
+    threshold (a fraction, e.g. 0.2 for 20%) and at least min_ms slower than in the
+    baseline. Per-item timings (us_...) are left out, as they repeat the totals.
+    """
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name, {})
+        for key in timing_keys(result):
+            if old.get(key) and not key.startswith("us_"):
+                ratio = result[key] / old[key]
+                if ratio > 1 + threshold and result[key] - old[key] >= min_ms:
+                    regressions.append((name, key, old[key], result[key], ratio))
+    return regressions
+
+BENCHMARKS = {
+    "background": bench_background,
+    "collisions": bench_collisions,
+    "frame": bench_frame,
+    "load_animation": bench_load_animation,
+    "first_frame": bench_first_frame,
+    "render_scale": bench_render_scale,
+    "restart": bench_restart,
+    "generation": bench_generation,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the game's performance benchmarks headless.")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(sorted(BENCHMARKS))})")
+    parser.add_argument("--json", help="write the results to this JSON file (e.g. to use as a baseline)")
+    parser.add_argument("--baseline", help="JSON file from an earlier --json run to compare against")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="run each benchmark this many times and keep the best timings (default: 3)")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fraction slower than the baseline that counts as a regression (default: 0.2)")
+    parser.add_argument("--min-ms", type=float, default=0.01,
+                        help="ignore slowdowns smaller than this many milliseconds (default: 0.01)")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+
+    # Assets are looked up relative to the working directory, as when the game runs.
+    os.chdir(ROOT_DIR)
+    init_headless()
+    # The same seeds every run; only timings should differ between runs.
+    random.seed(0)
+    results = {}
+    for name in args.names or sorted(BENCHMARKS):
+        result = results[name] = BENCHMARKS[name]()
+        # The fastest of several runs is the least disturbed by the rest of the machine.
+        for _ in range(args.runs - 1):
+            rerun = BENCHMARKS[name]()
+            for key in timing_keys(result):
+                result[key] = min(result[key], rerun[key])
+        print(name, ", ".join(f"{key}={value:.4f}" if isinstance(value, float) else f"{key}={value}"
+                              for key, value in result.items()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "pygame": pygame.version.ver, "platform": sys.platform,
+                       "runs": args.runs, "results": results}, f, indent=2)
+        print(f"Results written to {args.json}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        for name, key, old, new, ratio in regressions:
+            print(f"REGRESSION {name}.{key}: {old:.4f} -> {new:.4f} ({(ratio - 1) * 100:+.0f}%)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
@@ -8,3 +8,9 @@ class Collectible(pygame.sprite.Sprite):
         self.image = pygame.Surface((20, 20), pygame.SRCALPHA)
         pygame.draw.circle(self.image, (255, 223, 0), (10, 10), 10)
         self.rect = self.image.get_rect(center=(x, y))
+
+    def reset(self, x, y):
+        """
+        Reinitializes the collectible in place (see SpritePool).
+        """
+        self.rect.center = (x, y)
@@ -3,6 +3,8 @@ import pygame
 import os
 import sys
 
+from animation_cache import load_animation
+
 def resource_path(relative_path):
     """
     Get the absolute path to a resource, works for development and PyInstaller packed executables.
@@ -22,29 +24,38 @@ class Enemy(pygame.sprite.Sprite):
         # For example, if your enemy walk cycle has 4 frames:
         self.animation_specs = {"walk": 4}
         self.animations = {}
+        # animation -> {facing: frames}, so update() needs no key building.
+        self.frame_tables = {}
         self.scale = (40, 40)  # Enemy sprite size
 
         # Load each animation using resource_path
         for anim, frame_count in self.animation_specs.items():
             path = resource_path(os.path.join("assets", "enemy", f"{anim}.png"))
-            frames = self.load_animation(path, frame_count, self.scale)
-            self.animations[anim] = frames
+            self.animations[anim] = self.load_animation(path, frame_count, self.scale)
             # Precompute left-facing frames.
-            self.animations[anim + "_left"] = [pygame.transform.flip(frame, True, False) for frame in frames]
+            self.animations[anim + "_left"] = self.load_animation(path, frame_count, self.scale, flip=True)
+            self.frame_tables[anim] = {1: self.animations[anim], -1: self.animations[anim + "_left"]}
+
+        self.rect = self.animations["walk"][0].get_rect()
+        # Create a separate, smaller hitbox (for better collision detection)
+        self.hitbox = self.rect.inflate(-20, -20)
+        self.animation_speed = 0.15  # Seconds per frame
+        self.frame_ms = int(self.animation_speed * 1000)
+        self.reset(x, y, patrol_distance, speed)
 
+    def reset(self, x, y, patrol_distance=100, speed=2):
+        """
+        Reinitializes the enemy in place (see SpritePool) to start a new patrol from (x, y).
+        """
         self.current_animation = "walk"
+        self.current_frames = self.frame_tables["walk"]
         self.current_frame = 0
+        # Clock time the walk cycle started at, set by the first update().
+        self.animation_start = None
         self.image = self.animations[self.current_animation][self.current_frame]
-        self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
-
-        # Create a separate, smaller hitbox (for better collision detection)
-        hitbox = self.rect.inflate(-20, -20)
-        hitbox.center = self.rect.center
-        self.hitbox = hitbox
-
-        self.animation_speed = 0.15  # Seconds per frame
-        self.last_update_time = pygame.time.get_ticks()
+        self.prev_pos = self.rect.topleft
+        self.hitbox.center = self.rect.center
 
         # Movement attributes for patrolling.
         self.starting_x = x
@@ -52,44 +63,76 @@ class Enemy(pygame.sprite.Sprite):
         self.speed = speed
         self.direction = 1  # 1 for moving right, -1 for left.
         self.facing = 1     # 1 for facing right, -1 for facing left.
+        # Everywhere the enemy can be while patrolling (it overshoots each bound by
+        # up to one step before turning).
+        reach = patrol_distance + speed
+        self.patrol_rect = pygame.Rect(x - reach, y, 2 * reach + self.rect.width, self.rect.height)
 
-    def load_animation(self, path, frame_count, scale):
+    def load_animation(self, path, frame_count, scale, flip=False):
         """
-        Loads a sprite sheet from the given path and splits it into frame_count frames.
-        Each frame is scaled to the provided dimensions.
+        Returns the frames of the sprite sheet at path, split into frame_count frames
+        and scaled to the provided dimensions. Frames are shared through the
+        animation cache, so spawning many enemies only decodes the sheet once.
         """
-        frames = []
-        try:
-            sheet = pygame.image.load(path).convert_alpha()
-        except Exception as e:
-            print(f"Error loading enemy animation from {path}: {e}")
-            fallback = pygame.Surface(scale)
-            fallback.fill((0, 0, 255))
-            return [fallback]
-
-        sheet_width, sheet_height = sheet.get_size()
-        frame_width = sheet_width // frame_count
-        for i in range(frame_count):
-            frame_rect = (i * frame_width, 0, frame_width, sheet_height)
-            frame = sheet.subsurface(frame_rect)
-            frame = pygame.transform.scale(frame, scale)
-            frames.append(frame)
-        return frames
-
-    def update(self):
-        now = pygame.time.get_ticks()
-        if now - self.last_update_time > self.animation_speed * 1000:
-            self.last_update_time = now
-            self.current_frame = (self.current_frame + 1) % len(self.animations[self.current_animation])
+        return load_animation(path, frame_count, scale, flip, fallback_color=(0, 0, 255))
 
-        # Choose the appropriate animation set based on facing direction.
-        if self.facing == -1:
-            current_anim = self.current_animation + "_left"
+    def advance_patrol(self, ticks):
+        """
+        Moves the enemy to where ticks calls of update() would take it, in constant
+        time: direction and facing included, animation and prev_pos left alone.
+        """
+        speed = self.speed
+        if ticks <= 0 or speed <= 0:
+            return
+        left = self.starting_x - self.patrol_distance
+        right = self.starting_x + self.patrol_distance
+
+        def leg(x, direction):
+            # Ticks until the enemy passes a bound (and turns) moving from x.
+            return max(1, ((right - x) if direction == 1 else (x - left)) // speed + 1)
+
+        x = self.rect.x
+        direction = self.direction
+        first = leg(x, direction)
+        if ticks < first:
+            x += direction * speed * ticks
         else:
-            current_anim = self.current_animation
-        self.image = self.animations[current_anim][self.current_frame]
+            # Past the first turn, the patrol repeats with two legs of fixed length.
+            x += direction * speed * first
+            direction = -direction
+            out = leg(x, direction)
+            back = leg(x + direction * speed * out, -direction)
+            ticks = (ticks - first) % (out + back)
+            if ticks < out:
+                x += direction * speed * ticks
+            else:
+                x += direction * speed * (2 * out - ticks)
+                direction = -direction
+        self.hitbox.x += x - self.rect.x
+        self.rect.x = x
+        self.direction = direction
+        self.facing = direction
+
+    def animate(self, now):
+        """
+        Shows the walk cycle frame for clock time now (in milliseconds).
+        """
+        if self.animation_start is None:
+            self.animation_start = now
+        # Choose the appropriate animation set based on facing direction.
+        frames = self.current_frames[self.facing]
+        self.current_frame = (now - self.animation_start) // self.frame_ms % len(frames)
+        self.image = frames[self.current_frame]
+
+    def update(self, now):
+        """
+        Advances the patrol by one tick. now is the animation clock in milliseconds
+        (GameSimulation passes its tick time), which picks the animation frame.
+        """
+        self.animate(now)
 
-        # Update movement (patrol)
+        # Update movement (patrol), remembering the previous position for render interpolation.
+        self.prev_pos = self.rect.topleft
         self.rect.x += self.speed * self.direction
         self.hitbox.x += self.speed * self.direction
 
@@ -0,0 +1,155 @@
+# File: src/enemy_system.py
+import numpy as np
+
+from settings import TICK_RATE
+
+class EnemySystem:
+    """
+    Patrol movement for many enemies at once, stored as NumPy arrays.
+
+    Each enemy's position, direction, speed and patrol bounds live in parallel
+    arrays (a struct of arrays) and step() advances all of them with a few
+    vectorized operations, following the same rules as Enemy.update. The Enemy
+    sprites become thin views: their rect, hitbox, direction, facing and image
+    are only written back by sync(), which query() and collide() do for the
+    enemies they return. The system can stand in for the enemy SpatialHash, both
+    for collisions and as a Renderer index.
+    """
+
+    FIELDS = ("x", "prev_x", "start_x", "patrol_distance", "speed", "direction",
+              "hitbox_x", "hitbox_y", "hitbox_w", "hitbox_h", "anim_start")
+
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.tick = 0
+        self.views = []
+        for name in self.FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=np.int64))
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.views)
+
+    def _grow(self):
+        for name in self.FIELDS:
+            array = getattr(self, name)
+            grown = np.zeros(max(2 * len(array), 16), dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def add(self, *enemies):
+        """
+        Adds Enemy sprites (or iterables of them), copying their current patrol state.
+        """
+        for enemy in enemies:
+            if not hasattr(enemy, "hitbox"):
+                self.add(*enemy)
+                continue
+            if self.count == len(self.x):
+                self._grow()
+            i = self.count
+            self.x[i] = enemy.rect.x
+            self.prev_x[i] = enemy.prev_pos[0]
+            self.start_x[i] = enemy.starting_x
+            self.patrol_distance[i] = enemy.patrol_distance
+            self.speed[i] = enemy.speed
+            self.direction[i] = enemy.direction
+            # The hitbox is stored relative to the rect, which only moves horizontally.
+            self.hitbox_x[i] = enemy.hitbox.x - enemy.rect.x
+            self.hitbox_y[i] = enemy.hitbox.y
+            self.hitbox_w[i] = enemy.hitbox.width
+            self.hitbox_h[i] = enemy.hitbox.height
+            # Animation start on the simulation clock, in milliseconds.
+            now = self.tick * 1000 // TICK_RATE
+            self.anim_start[i] = now if enemy.animation_start is None else enemy.animation_start
+            enemy.system_index = i
+            self.views.append(enemy)
+            self.count += 1
+
+    def remove(self, enemy):
+        """
+        Removes an enemy by moving the last one into its slot.
+        """
+        i = getattr(enemy, "system_index", None)
+        if i is None or i >= self.count or self.views[i] is not enemy:
+            return
+        self.sync_index(i)
+        last = self.count - 1
+        if i != last:
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                array[i] = array[last]
+            moved = self.views[last]
+            self.views[i] = moved
+            moved.system_index = i
+        self.views.pop()
+        enemy.system_index = None
+        self.count -= 1
+
+    def clear(self):
+        for enemy in self.views:
+            enemy.system_index = None
+        self.views = []
+        self.count = 0
+
+    def step(self):
+        """
+        Advances every enemy's patrol by one tick.
+        """
+        n = self.count
+        x = self.x[:n]
+        direction = self.direction[:n]
+        self.prev_x[:n] = x
+        x += self.speed[:n] * direction
+        # Reverse direction if exceeding patrol boundaries.
+        start_x = self.start_x[:n]
+        patrol_distance = self.patrol_distance[:n]
+        direction[x > start_x + patrol_distance] = -1
+        direction[x < start_x - patrol_distance] = 1
+        self.tick += 1
+
+    def sync_index(self, i):
+        """
+        Writes the state of enemy i back to its sprite.
+        """
+        enemy = self.views[i]
+        x = int(self.x[i])
+        direction = int(self.direction[i])
+        enemy.rect.x = x
+        enemy.prev_pos = (int(self.prev_x[i]), enemy.rect.y)
+        enemy.hitbox.x = x + int(self.hitbox_x[i])
+        enemy.direction = direction
+        enemy.facing = direction
+        enemy.animation_start = int(self.anim_start[i])
+        frames = enemy.current_frames[direction]
+        enemy.current_frame = (self.tick * 1000 // TICK_RATE - enemy.animation_start) // enemy.frame_ms % len(frames)
+        enemy.image = frames[enemy.current_frame]
+        return enemy
+
+    def sync_all(self):
+        for i in range(self.count):
+            self.sync_index(i)
+
+    def query(self, rect):
+        """
+        Returns the (synced) enemies whose hitbox collides with rect.
+        """
+        n = self.count
+        left = self.x[:n] + self.hitbox_x[:n]
+        top = self.hitbox_y[:n]
+        hits = np.flatnonzero((left < rect.right) & (left + self.hitbox_w[:n] > rect.left) &
+                              (top < rect.bottom) & (top + self.hitbox_h[:n] > rect.top))
+        return [self.sync_index(i) for i in hits.tolist()]
+
+    def collide(self, sprite, dokill=False):
+        """
+        Like SpatialHash.collide: the enemies whose hitbox collides with sprite.rect.
+        """
+        hits = self.query(sprite.rect)
+        if dokill:
+            for hit in hits:
+                hit.kill()
+                self.remove(hit)
+        return hits
@@ -0,0 +1,94 @@
+# File: src/level_baker.py
+import pygame
+
+class BakedLevel:
+    """
+    Static level geometry (platforms) composited once into square chunk surfaces.
+
+    Platforms never move after generate_level returns, so instead of blitting
+    every Platform sprite each frame the renderer blits the handful of chunks
+    that overlap the camera. Chunks are only created where there is geometry.
+    Empty pixels are filled with colorkey, which is set as the surface's
+    transparent color (with RLE acceleration for fast blits).
+
+    For reduced render resolutions draw() takes a scale; the chunks scaled to the
+    last scale used are kept.
+    """
+
+    def __init__(self, sprites, chunk_size=512, colorkey=(255, 0, 255)):
+        self.chunk_size = chunk_size
+        self.colorkey = colorkey
+        self.chunks = {}
+        self.sprite_count = 0
+        self.scaled_chunks = {}
+        self.scaled_for = 1.0
+        for sprite in sprites:
+            self.bake(sprite)
+        self.finish()
+
+    def bake(self, sprite):
+        """
+        Composites a sprite's image into every chunk its rect overlaps.
+        """
+        size = self.chunk_size
+        rect = sprite.rect
+        for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk is None:
+                    chunk = pygame.Surface((size, size))
+                    chunk.fill(self.colorkey)
+                    self.chunks[(cx, cy)] = chunk
+                chunk.blit(sprite.image, (rect.x - cx * size, rect.y - cy * size))
+        self.sprite_count += 1
+
+    def finish(self):
+        """
+        Makes the colorkey transparent in every chunk. Called by the constructor;
+        call it again after baking more sprites into a level built empty.
+        """
+        for surface in self.chunks.values():
+            surface.set_colorkey(self.colorkey, pygame.RLEACCEL)
+
+    def chunks_in(self, world_rect):
+        """
+        Returns (surface, (world x, world y)) pairs for the chunks overlapping world_rect.
+        """
+        size = self.chunk_size
+        found = []
+        for cx in range(world_rect.left // size, (world_rect.right - 1) // size + 1):
+            for cy in range(world_rect.top // size, (world_rect.bottom - 1) // size + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk is not None:
+                    found.append((chunk, (cx * size, cy * size)))
+        return found
+
+    def scaled_chunk(self, chunk, scale):
+        """
+        Returns chunk scaled by scale, from the cache of the last scale used.
+        """
+        if scale != self.scaled_for:
+            self.scaled_chunks.clear()
+            self.scaled_for = scale
+        scaled = self.scaled_chunks.get(chunk)
+        if scaled is None:
+            # Nearest-neighbour scaling keeps the colorkey pixels exact.
+            size = round(self.chunk_size * scale)
+            scaled = self.scaled_chunks[chunk] = pygame.transform.scale(chunk, (size, size))
+            scaled.set_colorkey(self.colorkey, pygame.RLEACCEL)
+        return scaled
+
+    def draw(self, screen, world_rect, offset, scale=1.0):
+        """
+        Blits the chunks overlapping world_rect, shifted by the camera offset (and
+        scaled by scale when rendering at a reduced resolution).
+        Returns the number of chunks drawn.
+        """
+        offset_x, offset_y = offset
+        chunks = self.chunks_in(world_rect)
+        if scale == 1.0:
+            screen.blits([(chunk, (x - offset_x, y - offset_y)) for chunk, (x, y) in chunks], False)
+        else:
+            screen.blits([(self.scaled_chunk(chunk, scale), (round((x - offset_x) * scale), round((y - offset_y) * scale)))
+                          for chunk, (x, y) in chunks], False)
+        return len(chunks)
@@ -0,0 +1,216 @@
+# File: src/level_batch.py
+import argparse
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from level_generator import LevelGenerator
+from settings import LEVEL_WIDTH, LEVEL_HEIGHT, GROUND_Y, LEVEL_CACHE_DIR
+
+# Bump whenever generate_layout changes, so stale cached layouts are ignored.
+LAYOUT_VERSION = 1
+
+# The generator parameters run_game uses.
+DEFAULT_PARAMS = {
+    "level_width": LEVEL_WIDTH,
+    "level_height": LEVEL_HEIGHT,
+    "ground_y": GROUND_Y,
+    "num_platforms": 10,
+    "enemy_chance": 0.6,
+}
+
+def generate_layout(seed, params=DEFAULT_PARAMS):
+    """
+    Generates the layout for one seed. A module-level function so worker processes can run it.
+    """
+    generator = LevelGenerator(params["level_width"], params["level_height"], params["ground_y"],
+                               num_platforms=params["num_platforms"], enemy_chance=params["enemy_chance"],
+                               seed=seed)
+    return generator.generate_layout()
+
+def generate_winnable_layouts(seeds, params=DEFAULT_PARAMS):
+    """
+    Generates the layouts for several seeds and lets bot players check them (see
+    playability.check_playability). Returns a list with each layout, or None where
+    it isn't proven winnable. A module-level function so worker processes can run it.
+    """
+    # Imported here so NumPy is only needed when levels are checked.
+    from playability import check_playability
+    layouts = [generate_layout(seed, params) for seed in seeds]
+    reports = check_playability(layouts, params["level_width"], params["ground_y"])
+    return [layout if report["winnable"] else None for layout, report in zip(layouts, reports)]
+
+def validate_layout(layout, params=DEFAULT_PARAMS):
+    """
+    Checks that a layout is well formed for the given parameters: a full-width ground
+    platform first, every platform inside the level, every enemy standing on a
+    platform, and a collectible above every floating platform.
+    Returns True if the layout is valid.
+    """
+    try:
+        platforms, enemies, collectibles = layout
+        ground = platforms[0]
+        if tuple(ground[:3]) != (0, params["ground_y"], params["level_width"]):
+            return False
+        for x, y, width, height, color in platforms:
+            if x < 0 or x + width > params["level_width"] or y < 0 or y + height > params["level_height"]:
+                return False
+        tops = {y for x, y, width, height, color in platforms}
+        for x, y, patrol_distance, speed in enemies:
+            if y + 40 not in tops or patrol_distance <= 0 or speed <= 0:
+                return False
+        floating = sum(1 for x, y, width, height, color in platforms if y < params["ground_y"])
+        return len(collectibles) == floating
+    except (TypeError, ValueError, IndexError, KeyError):
+        return False
+
+class LevelCache:
+    """
+    An on-disk cache of validated level layouts, keyed by (seed, generator parameters).
+
+    Layouts are stored as JSON, one file per seed, in a directory per parameter set
+    (cache_dir/<params hash>/<seed>.json), so the seeds available for a parameter
+    set can be listed. Files are written atomically; unreadable or invalid files
+    are treated as misses.
+    """
+
+    def __init__(self, cache_dir=LEVEL_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def params_key(params):
+        encoded = json.dumps(dict(params, version=LAYOUT_VERSION), sort_keys=True).encode("utf-8")
+        return hashlib.sha1(encoded).hexdigest()[:16]
+
+    def params_dir(self, params):
+        return os.path.join(self.cache_dir, self.params_key(params))
+
+    def path(self, seed, params=DEFAULT_PARAMS):
+        return os.path.join(self.params_dir(params), f"{seed}.json")
+
+    def get(self, seed, params=DEFAULT_PARAMS):
+        """
+        Returns the cached layout for seed, or None.
+        """
+        try:
+            with open(self.path(seed, params)) as f:
+                layout = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return layout if validate_layout(layout, params) else None
+
+    def put(self, seed, layout, params=DEFAULT_PARAMS):
+        """
+        Stores a layout for seed.
+        """
+        path = self.path(seed, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(layout, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    def seeds(self, params=DEFAULT_PARAMS):
+        """
+        Returns the seeds with a cached layout for params.
+        """
+        try:
+            names = os.listdir(self.params_dir(params))
+        except OSError:
+            return []
+        return sorted(int(name[:-5]) for name in names if name.endswith(".json") and name[:-5].lstrip("-").isdigit())
+
+def generate_levels(seeds, params=DEFAULT_PARAMS, cache=None, processes=None, require_winnable=False):
+    """
+    Generates the layouts for many seeds across a process pool.
+
+    Seeds already in cache are loaded instead of generated, and newly generated
+    layouts that pass validate_layout are stored in it. Returns a dict mapping
+    each seed to its layout; seeds whose layout fails validation are left out.
+    With require_winnable, new layouts are also played by bots (in batches of
+    64 seeds per task) and left out unless every collectible was reached; cached
+    layouts are not checked again.
+    """
+    layouts = {}
+    missing = []
+    for seed in seeds:
+        layout = cache.get(seed, params) if cache is not None else None
+        if layout is not None:
+            layouts[seed] = layout
+        else:
+            missing.append(seed)
+
+    if missing:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            if require_winnable:
+                batches = [missing[i:i + 64] for i in range(0, len(missing), 64)]
+                generated = (layout for batch in executor.map(generate_winnable_layouts, batches,
+                                                              [params] * len(batches))
+                             for layout in batch)
+            else:
+                chunksize = max(1, len(missing) // ((processes or os.cpu_count() or 1) * 4))
+                generated = executor.map(generate_layout, missing, [params] * len(missing), chunksize=chunksize)
+            for seed, layout in zip(missing, generated):
+                if layout is None:
+                    print(f"Discarding layout for seed {seed}: not proven winnable")
+                    continue
+                if not validate_layout(layout, params):
+                    print(f"Discarding invalid layout for seed {seed}")
+                    continue
+                layouts[seed] = layout
+                if cache is not None:
+                    cache.put(seed, layout, params)
+    return layouts
+
+def load_level_layout(seed=None, params=DEFAULT_PARAMS, cache=None):
+    """
+    Returns (seed, layout) for run_game. With a seed (e.g. a daily challenge), the
+    cached layout is used if there is one, otherwise it is generated and cached.
+    Without a seed, a random pre-generated level is picked from the cache, falling
+    back to generating one for a new random seed (not cached, to keep the cache bounded).
+
+    Generated layouts are played by bots first (see generate_winnable_layouts) and
+    only used once proven winnable: a random seed that fails is replaced by another,
+    and a given seed that fails moves on to seed + 1, seed + 2, ... so every player
+    of the same seed still gets the same level. The returned seed is the one played.
+    """
+    cache = cache or LevelCache()
+    if seed is None:
+        cached_seeds = cache.seeds(params)
+        if not cached_seeds:
+            while True:
+                seed = random.randrange(2 ** 32)
+                layout = generate_winnable_layouts([seed], params)[0]
+                if layout is not None:
+                    return seed, layout
+        seed = random.choice(cached_seeds)
+    while True:
+        layout = cache.get(seed, params)
+        if layout is not None:
+            return seed, layout
+        layout = generate_winnable_layouts([seed], params)[0]
+        if layout is not None:
+            cache.put(seed, layout, params)
+            return seed, layout
+        seed += 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate levels into the on-disk level cache.")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--num-platforms", type=int, default=DEFAULT_PARAMS["num_platforms"])
+    parser.add_argument("--cache-dir", default=LEVEL_CACHE_DIR)
+    parser.add_argument("--winnable", action="store_true",
+                        help="only keep levels bot players could win (requires NumPy; cached levels are not re-checked)")
+    args = parser.parse_args()
+
+    params = dict(DEFAULT_PARAMS, num_platforms=args.num_platforms)
+    start = time.perf_counter()
+    layouts = generate_levels(range(args.first_seed, args.first_seed + args.count), params,
+                              LevelCache(args.cache_dir), args.processes, args.winnable)
+    elapsed = time.perf_counter() - start
+    print(f"{len(layouts)} levels ready in {args.cache_dir} ({elapsed:.2f}s)")
@@ -0,0 +1,212 @@
+# File: src/level_format.py
+import argparse
+import mmap
+import os
+import struct
+import time
+
+from platform import Platform
+from enemy import Enemy
+from collectible import Collectible
+
+# File layout (all little-endian):
+#   header:       magic, format version, reserved, level width, level height, ground y,
+#                 platform count, enemy count, collectible count
+#   platforms:    x, y, width, height, red, green, blue, padding   (20 bytes each)
+#   enemies:      x, y, patrol distance, speed                     (12 bytes each)
+#   collectibles: center x, center y                               (8 bytes each)
+MAGIC = b"CPLV"
+VERSION = 1
+HEADER = struct.Struct("<4sHHiiiIII")
+PLATFORM = struct.Struct("<iiIIBBBx")
+ENEMY = struct.Struct("<iiHH")
+COLLECTIBLE = struct.Struct("<ii")
+
+def write_level(path, layout, level_width, level_height, ground_y):
+    """
+    Writes a layout (platforms, enemies, collectibles as produced by
+    LevelGenerator.generate_layout) to path in the binary level format.
+    """
+    platforms, enemies, collectibles = layout
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, level_width, level_height, ground_y,
+                            len(platforms), len(enemies), len(collectibles)))
+        f.write(b"".join(PLATFORM.pack(x, y, width, height, *color)
+                         for x, y, width, height, color in platforms))
+        f.write(b"".join(ENEMY.pack(x, y, patrol_distance, speed)
+                         for x, y, patrol_distance, speed in enemies))
+        f.write(b"".join(COLLECTIBLE.pack(x, y) for x, y in collectibles))
+
+def layout_from_sprites(platforms, enemies, collectibles):
+    """
+    Captures live level sprites as a layout, so a level in play can be saved.
+    Enemies are recorded at their spawn position.
+    """
+    return (
+        [(p.rect.x, p.rect.y, p.rect.width, p.rect.height, tuple(p.image.get_at((0, 0)))[:3]) for p in platforms],
+        [(e.starting_x, e.rect.y, e.patrol_distance, e.speed) for e in enemies],
+        [c.rect.center for c in collectibles],
+    )
+
+class LazySprites:
+    """
+    A read-only sequence that builds each sprite from its record the first time it is accessed.
+    """
+
+    def __init__(self, count, record, factory):
+        self.count = count
+        self.record = record
+        self.factory = factory
+        self.built = {}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("sprite index out of range")
+        sprite = self.built.get(index)
+        if sprite is None:
+            sprite = self.built[index] = self.factory(*self.record(index))
+        return sprite
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+class LevelFile:
+    """
+    A level in the binary format, memory-mapped for reading.
+
+    Opening a file only reads the header; records are decoded straight from the
+    mapping when asked for, and sprites are only built for the records that are
+    accessed through platform_sprites, enemy_sprites and collectible_sprites.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            # An empty file can't be mapped, and a short one has no complete header.
+            if os.fstat(self.file.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{path} is truncated")
+            self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self.file.close()
+            raise
+        (magic, version, _, self.level_width, self.level_height, self.ground_y,
+         self.platform_count, self.enemy_count, self.collectible_count) = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a level file")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{path} has unsupported level format version {version}")
+        self.platform_offset = HEADER.size
+        self.enemy_offset = self.platform_offset + self.platform_count * PLATFORM.size
+        self.collectible_offset = self.enemy_offset + self.enemy_count * ENEMY.size
+        if len(self.buffer) < self.collectible_offset + self.collectible_count * COLLECTIBLE.size:
+            self.close()
+            raise ValueError(f"{path} is truncated")
+
+        self.platform_sprites = LazySprites(
+            self.platform_count, self.platform_record,
+            lambda x, y, width, height, color: Platform(x, y, width, height, color=color))
+        self.enemy_sprites = LazySprites(
+            self.enemy_count, self.enemy_record,
+            lambda x, y, patrol_distance, speed: Enemy(x, y, patrol_distance=patrol_distance, speed=speed))
+        self.collectible_sprites = LazySprites(self.collectible_count, self.collectible_record, Collectible)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.buffer.close()
+        self.file.close()
+
+    def platform_record(self, index):
+        x, y, width, height, red, green, blue = PLATFORM.unpack_from(
+            self.buffer, self.platform_offset + index * PLATFORM.size)
+        return x, y, width, height, (red, green, blue)
+
+    def enemy_record(self, index):
+        return ENEMY.unpack_from(self.buffer, self.enemy_offset + index * ENEMY.size)
+
+    def collectible_record(self, index):
+        return COLLECTIBLE.unpack_from(self.buffer, self.collectible_offset + index * COLLECTIBLE.size)
+
+    def chunk_index(self, chunk_width):
+        """
+        Sorts the records into chunks of chunk_width pixels without building any
+        sprites. Returns three dicts of chunk index -> record indexes: platforms
+        (under every chunk they overlap), enemies (by spawn x) and collectibles
+        (by center x).
+        """
+        last = max(0, (self.level_width - 1) // chunk_width)
+
+        def chunk_of(x):
+            # Anything outside the level goes to the nearest chunk.
+            return min(max(x // chunk_width, 0), last)
+
+        platforms, enemies, collectibles = {}, {}, {}
+        view = memoryview(self.buffer)
+        try:
+            for index, (x, _, width, *_) in enumerate(PLATFORM.iter_unpack(view[self.platform_offset:self.enemy_offset])):
+                for chunk in range(chunk_of(x), chunk_of(x + max(width, 1) - 1) + 1):
+                    platforms.setdefault(chunk, []).append(index)
+            for index, (x, *_) in enumerate(ENEMY.iter_unpack(view[self.enemy_offset:self.collectible_offset])):
+                enemies.setdefault(chunk_of(x), []).append(index)
+            for index, (x, _) in enumerate(COLLECTIBLE.iter_unpack(
+                    view[self.collectible_offset:self.collectible_offset + self.collectible_count * COLLECTIBLE.size])):
+                collectibles.setdefault(chunk_of(x), []).append(index)
+        finally:
+            view.release()
+        return platforms, enemies, collectibles
+
+    def layout(self):
+        """
+        Decodes every record into a layout, as returned by LevelGenerator.generate_layout.
+        """
+        view = memoryview(self.buffer)
+        try:
+            platforms = [(x, y, width, height, (red, green, blue)) for x, y, width, height, red, green, blue in
+                         PLATFORM.iter_unpack(view[self.platform_offset:self.enemy_offset])]
+            enemies = list(ENEMY.iter_unpack(view[self.enemy_offset:self.collectible_offset]))
+            collectibles = list(COLLECTIBLE.iter_unpack(
+                view[self.collectible_offset:self.collectible_offset + self.collectible_count * COLLECTIBLE.size]))
+        finally:
+            view.release()
+        return platforms, enemies, collectibles
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a generated level to the binary format and time reading it back.")
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--platforms", type=int, default=100000)
+    args = parser.parse_args()
+
+    from level_generator import LevelGenerator
+    from settings import LEVEL_HEIGHT, GROUND_Y
+    level_width = max(1600, args.platforms * 16)
+    generator = LevelGenerator(level_width, LEVEL_HEIGHT, GROUND_Y, num_platforms=args.platforms, seed=args.seed)
+    start = time.perf_counter()
+    layout = generator.generate_layout()
+    generate_ms = (time.perf_counter() - start) * 1000
+    write_level(args.path, layout, level_width, LEVEL_HEIGHT, GROUND_Y)
+
+    start = time.perf_counter()
+    with LevelFile(args.path) as level:
+        open_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        level.platform_sprites[level.platform_count - 1]
+        first_sprite_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        decoded = level.layout()
+        decode_ms = (time.perf_counter() - start) * 1000
+    print(f"{len(layout[0])} platforms: generate {generate_ms:.1f} ms, open {open_ms:.3f} ms, "
+          f"first sprite {first_sprite_ms:.3f} ms, decode all {decode_ms:.1f} ms, "
+          f"round trip {'ok' if decoded == layout else 'MISMATCH'}")
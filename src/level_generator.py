@@ -1,25 +1,42 @@
 # File: src/level_generator.py
 import random
+from bisect import bisect_right, insort
 import pygame
 from platform import Platform
 from enemy import Enemy
+from collectible import Collectible
 
 class LevelGenerator:
-    def __init__(self, screen_width, screen_height, ground_y, num_platforms=5, enemy_chance=0.5):
+    def __init__(self, screen_width, screen_height, ground_y, num_platforms=5, enemy_chance=0.5, seed=None):
         """
         Parameters:
             screen_width, screen_height: Dimensions of the level (world).
             ground_y: The y-coordinate where the ground platform sits.
             num_platforms: Total number of floating platforms to generate.
             enemy_chance: Probability (0 to 1) of spawning an enemy on a given platform.
+            seed: Optional seed; levels generated with the same seed are identical.
         """
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.ground_y = ground_y
         self.num_platforms = num_platforms
         self.enemy_chance = enemy_chance
+        self.seed = seed
+        # Use a private random generator so seeded levels don't depend on global state.
+        self.random = random.Random(seed)
 
     def generate_level(self):
+        """
+        Generates a random level (see generate_layout) and builds its sprites.
+
+        Returns:
+            A tuple of sprite groups: (platform_sprites, enemy_sprites)
+        """
+        platform_data, enemy_data, collectible_data = self.generate_layout()
+        platforms, enemies, _ = self.build_sprites((platform_data, enemy_data, []))
+        return pygame.sprite.Group(platforms), pygame.sprite.Group(enemies)
+
+    def generate_layout(self):
         """
         Generates a random level layout with a reachable "main chain" of platforms:
 
@@ -28,19 +45,25 @@ class LevelGenerator:
           3. Extra platforms: Attempts to generate the remainder, but only accepts extra platforms
              if they are within a maximum vertical gap (150 pixels) of any already accessible platform.
           4. Enemies are spawned on platforms (with lower enemy speeds) based on a given chance.
+          5. A collectible is placed above every platform except the ground.
+
+        The layout is plain data (no pygame surfaces), so it can be generated in another
+        process, cached on disk and turned into sprites later with build_sprites.
 
         Returns:
-            A tuple of sprite groups: (platform_sprites, enemy_sprites)
+            A tuple of lists (platforms, enemies, collectibles), with platforms as
+            (x, y, width, height, color), enemies as (x, y, patrol_distance, speed) and
+            collectibles as (x, y) center positions.
         """
-        platform_sprites = pygame.sprite.Group()
-        enemy_sprites = pygame.sprite.Group()
-
         # 1. Create the ground platform.
-        ground = Platform(0, self.ground_y, self.screen_width, 50, color=(0, 255, 0))
-        platform_sprites.add(ground)
+        platforms = [(0, self.ground_y, self.screen_width, 50, (0, 255, 0))]
+        enemies = []
 
-        # This list will keep track of platforms that are known to be reachable.
-        accessible_platforms = []
+        # Sorted, distinct tops of the platforms that are known to be reachable. Tops are
+        # whole pixels within the level height, so this index stays small however many
+        # platforms there are, and reachability becomes a bisect instead of a scan.
+        accessible_tops = []
+        accessible_top_set = set()
 
         # 2. Generate a main chain (60% of total platforms).
         chain_count = max(1, int(self.num_platforms * 0.6))
@@ -49,25 +72,25 @@ class LevelGenerator:
 
         for _ in range(chain_count):
             # Increase platform size by using a larger width range.
-            width = random.randint(120, 250)
-            height = random.randint(20, 30)
-            x = random.randint(0, self.screen_width - width)
+            width = self.random.randint(120, 250)
+            height = self.random.randint(20, 30)
+            x = self.random.randint(0, self.screen_width - width)
 
             # Use a low vertical gap for easier jumps (30 to 80 pixels).
-            gap = random.randint(30, 80)
+            gap = self.random.randint(30, 80)
             current_y = max(50, current_y - gap)
 
-            plat = Platform(x, current_y, width, height, color=(0, 200, 0))
-            accessible_platforms.append(plat)
-            platform_sprites.add(plat)
+            platforms.append((x, current_y, width, height, (0, 200, 0)))
+            if current_y not in accessible_top_set:
+                accessible_top_set.add(current_y)
+                insort(accessible_tops, current_y)
 
             # With a certain probability, spawn an enemy on this platform.
-            if random.random() < self.enemy_chance:
-                enemy_x = x + random.randint(0, max(0, width - 40))
+            if self.random.random() < self.enemy_chance:
+                enemy_x = x + self.random.randint(0, max(0, width - 40))
                 enemy_y = current_y - 40  # Positioned just above the platform.
-                enemy_speed = random.choice([1, 2])  # Slower enemy speeds.
-                enemy = Enemy(enemy_x, enemy_y, patrol_distance=random.randint(50, 100), speed=enemy_speed)
-                enemy_sprites.add(enemy)
+                enemy_speed = self.random.choice([1, 2])  # Slower enemy speeds.
+                enemies.append((enemy_x, enemy_y, self.random.randint(50, 100), enemy_speed))
 
         # 3. Generate extra platforms.
         extra_count = self.num_platforms - chain_count
@@ -76,34 +99,157 @@ class LevelGenerator:
         attempts = 0  # Limit number of attempts to avoid an infinite loop.
         while len(extra_platforms) < extra_count and attempts < extra_count * 10:
             attempts += 1
-            width = random.randint(100, 180)
-            height = random.randint(15, 25)
-            x = random.randint(0, self.screen_width - width)
+            width = self.random.randint(100, 180)
+            height = self.random.randint(15, 25)
+            x = self.random.randint(0, self.screen_width - width)
             # Restrict y to be between the highest main-chain platform and the ground.
-            min_chain_y = min(p.rect.top for p in accessible_platforms) if accessible_platforms else 50
-            y = random.randint(min_chain_y, self.ground_y - 100)
-
-            # Check if this candidate platform is reachable from any platform in accessible_platforms.
-            reachable = False
-            for p in accessible_platforms:
-                # Consider it reachable if it is above an accessible platform by no more than max_vertical_gap.
-                if y < p.rect.top:
-                    if (p.rect.top - y) <= max_vertical_gap:
-                        reachable = True
-                        break
-            if reachable:
-                plat = Platform(x, y, width, height, color=(0, 180, 0))
-                extra_platforms.append(plat)
-                accessible_platforms.append(plat)
-
-        # Add extra platforms to the sprite group.
-        for plat in extra_platforms:
-            platform_sprites.add(plat)
-            if random.random() < self.enemy_chance * 0.5:
-                enemy_x = plat.rect.left + random.randint(0, max(0, plat.rect.width - 40))
-                enemy_y = plat.rect.top - 40
-                enemy_speed = random.choice([1, 2])
-                enemy = Enemy(enemy_x, enemy_y, patrol_distance=random.randint(50, 100), speed=enemy_speed)
-                enemy_sprites.add(enemy)
-
-        return platform_sprites, enemy_sprites
+            min_chain_y = accessible_tops[0] if accessible_tops else 50
+            y = self.random.randint(min_chain_y, self.ground_y - 100)
+
+            # Consider it reachable if it is above an accessible platform by no more than
+            # max_vertical_gap, i.e. if the lowest accessible top below y is close enough.
+            index = bisect_right(accessible_tops, y)
+            if index < len(accessible_tops) and accessible_tops[index] - y <= max_vertical_gap:
+                extra_platforms.append((x, y, width, height, (0, 180, 0)))
+                if y not in accessible_top_set:
+                    accessible_top_set.add(y)
+                    insort(accessible_tops, y)
+
+        # Add extra platforms to the layout.
+        for x, y, width, height, color in extra_platforms:
+            platforms.append((x, y, width, height, color))
+            if self.random.random() < self.enemy_chance * 0.5:
+                enemy_x = x + self.random.randint(0, max(0, width - 40))
+                enemy_y = y - 40
+                enemy_speed = self.random.choice([1, 2])
+                enemies.append((enemy_x, enemy_y, self.random.randint(50, 100), enemy_speed))
+
+        # 5. Collectibles above every floating platform.
+        collectibles = [(x + width // 2, y - 10) for x, y, width, height, color in platforms
+                        if y < self.ground_y]
+
+        return platforms, enemies, collectibles
+
+    @staticmethod
+    def build_sprites(layout, pool=None):
+        """
+        Builds the sprites for a layout from generate_layout or generate_chunk,
+        recycling sprites from pool (a SpritePool) if one is given.
+
+        Returns:
+            A tuple of lists: (platforms, enemies, collectibles)
+        """
+        sprites = ([], [], [])
+        for _ in LevelGenerator.build_sprites_stepwise(layout, sprites, pool):
+            pass
+        return sprites
+
+    @staticmethod
+    def build_sprites_stepwise(layout, sprites, pool=None):
+        """
+        Like build_sprites, but a generator that yields after every sprite, so the
+        work can be spread over several frames. The sprites are appended to
+        sprites, a tuple of lists (platforms, enemies, collectibles).
+        """
+        platform_data, enemy_data, collectible_data = layout
+        platforms, enemies, collectibles = sprites
+        if pool is None:
+            def acquire(cls, *args, **kwargs):
+                return cls(*args, **kwargs)
+        else:
+            acquire = pool.acquire
+        for x, y, width, height, color in platform_data:
+            platforms.append(acquire(Platform, x, y, width, height, color=tuple(color)))
+            yield
+        for x, y, patrol_distance, speed in enemy_data:
+            enemies.append(acquire(Enemy, x, y, patrol_distance=patrol_distance, speed=speed))
+            yield
+        for x, y in collectible_data:
+            collectibles.append(acquire(Collectible, x, y))
+            yield
+
+    def chain_anchor_y(self, boundary):
+        """
+        Height of the main chain where it crosses the left edge of chunk number boundary.
+        Derived only from the seed and boundary, so neighbouring chunks agree on it
+        without having to generate each other.
+        """
+        if boundary == 0:
+            # Start low enough to jump onto from the ground.
+            return self.ground_y - 90
+        rng = random.Random(f"{self.seed}:anchor:{boundary}")
+        return rng.randint(self.ground_y - 300, self.ground_y - 60)
+
+    def generate_chunk(self, index):
+        """
+        Generates chunk number index of an endless level, screen_width pixels wide
+        (at least 1600, so the main chain has room to reach the next anchor height).
+        Chunks are seeded from (seed, index), so a chunk regenerates identically.
+
+          1. Ground platform: covers the bottom of the chunk.
+          2. Main chain: platforms stepping left to right, at most 80 pixels apart vertically,
+             from this chunk's anchor height to the next chunk's, so the chain stays
+             reachable across chunk boundaries.
+          3. Extra platforms: up to num_platforms in total, each within 150 pixels above
+             a chain platform of this chunk.
+          4. Enemies are spawned on platforms based on a given chance, and a collectible
+             is placed above every platform except the ground.
+
+        Returns:
+            A tuple of plain data lists (platforms, enemies, collectibles), with platforms as
+            (x, y, width, height, color), enemies as (x, y, patrol_distance, speed) and
+            collectibles as (x, y) center positions.
+        """
+        rng = random.Random(f"{self.seed}:{index}")
+        left = index * self.screen_width
+        right = left + self.screen_width
+
+        platforms = [(left, self.ground_y, self.screen_width, 50, (0, 255, 0))]
+        enemies = []
+
+        # 2. Main chain, steered towards the next chunk's anchor height.
+        y = self.chain_anchor_y(index)
+        target_y = self.chain_anchor_y(index + 1)
+        x = left + rng.randint(20, 60)
+        chain = []
+        while True:
+            width = rng.randint(120, 250)
+            height = rng.randint(20, 30)
+            last = x + width + 100 + 250 > right
+            if last:
+                # The last platform sits at the anchor height and reaches close to the right edge.
+                width = right - 20 - x
+                y = target_y
+            chain.append((x, y, width, height, (0, 200, 0)))
+            if last:
+                break
+            x += width + rng.randint(40, 100)
+            if abs(target_y - y) > 40:
+                y += max(-80, min(80, target_y - y))
+            else:
+                y = rng.randint(max(target_y - 40, y - 80), min(target_y + 40, y + 80))
+        platforms.extend(chain)
+
+        # 3. Extra platforms.
+        max_vertical_gap = 150
+        extra_count = max(0, self.num_platforms - len(chain))
+        extras = 0
+        attempts = 0  # Limit number of attempts to avoid an infinite loop.
+        while extras < extra_count and attempts < extra_count * 10:
+            attempts += 1
+            width = rng.randint(100, 180)
+            height = rng.randint(15, 25)
+            x = rng.randint(left, right - width)
+            y = rng.randint(self.ground_y - 300 - max_vertical_gap, self.ground_y - 100)
+            if any(0 < top - y <= max_vertical_gap for _, top, _, _, _ in chain):
+                platforms.append((x, y, width, height, (0, 180, 0)))
+                extras += 1
+
+        # 4. Enemies and collectibles.
+        for x, y, width, height, color in platforms[1:]:
+            if rng.random() < self.enemy_chance:
+                enemy_x = x + rng.randint(0, max(0, width - 40))
+                enemies.append((enemy_x, y - 40, rng.randint(50, 100), rng.choice([1, 2])))
+        collectibles = [(x + width // 2, y - 10) for x, y, width, height, color in platforms[1:]]
+
+        return platforms, enemies, collectibles
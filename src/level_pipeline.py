@@ -0,0 +1,108 @@
+# File: src/level_pipeline.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from level_generator import LevelGenerator
+from level_baker import BakedLevel
+
+class PreparedLevel:
+    """
+    A level ready to play: the GameSimulation arguments (config) plus, for a level
+    with a layout, its sprites (as build_sprites returns them) and its platforms
+    baked into a BakedLevel. Streaming levels build themselves, so for them
+    level_sprites and baked are None.
+    """
+
+    def __init__(self, config, level_sprites=None, baked=None):
+        self.config = config
+        self.level_sprites = level_sprites
+        self.baked = baked
+
+    def sprites(self):
+        """All the level's sprites, for SpritePool.release_all(keep=...)."""
+        if self.level_sprites is None:
+            return []
+        platforms, enemies, collectibles = self.level_sprites
+        return platforms + enemies + collectibles
+
+class LevelPipeline:
+    """
+    Prepares the next level while the current one is played or a menu is shown,
+    so starting it takes no more than constructing the GameSimulation.
+
+    start() runs choose_level (which returns a GameSimulation config, reading
+    layouts from disk or generating them) on a worker thread. Sprites and baked
+    surfaces must be created on the main thread, so pump(), called once per frame,
+    builds them from the layout in slices of about slice_ms milliseconds. take()
+    hands over the prepared level, finishing whatever is left first (so it never
+    has to be waited for by a caller that didn't pump), and start() then prepares
+    the one after. Sprites come from pool; release the previous level's sprites
+    (keeping the prepared ones) before the next level is prepared, so it reuses them.
+    """
+
+    def __init__(self, choose_level, pool, slice_ms=2.0):
+        self.choose_level = choose_level
+        self.pool = pool
+        self.slice_ms = slice_ms
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+        self.steps = None
+        self.prepared = None
+
+    @property
+    def ready(self):
+        """True once the next level is completely prepared."""
+        return self.prepared is not None
+
+    def start(self):
+        """
+        Starts preparing the next level, unless one is already being prepared.
+        """
+        if self.future is None and self.prepared is None:
+            self.future = self.executor.submit(self.choose_level)
+
+    def pump(self, slice_ms=None):
+        """
+        Does up to slice_ms (default self.slice_ms) of main-thread preparation.
+        Returns True once the next level is ready.
+        """
+        if self.future is None or not self.future.done():
+            return self.ready
+        deadline = time.perf_counter() + (self.slice_ms if slice_ms is None else slice_ms) / 1000
+        if self.steps is None:
+            self.steps = self._build(self.future.result())
+        for _ in self.steps:
+            if time.perf_counter() >= deadline:
+                return False
+        return True
+
+    def _build(self, config):
+        # One step per sprite built or platform baked; done once the level is prepared.
+        layout = config.get("layout")
+        if layout is None:
+            self.prepared = PreparedLevel(config)
+            return
+        level_sprites = ([], [], [])
+        yield from LevelGenerator.build_sprites_stepwise(layout, level_sprites, self.pool)
+        baked = BakedLevel([])
+        for platform in level_sprites[0]:
+            baked.bake(platform)
+            yield
+        baked.finish()
+        self.prepared = PreparedLevel(config, level_sprites, baked)
+
+    def take(self):
+        """
+        Returns the next PreparedLevel, preparing (the rest of) it right away if needed.
+        """
+        self.start()
+        while not self.pump(float("inf")):
+            self.future.result()
+        prepared = self.prepared
+        self.future = None
+        self.steps = None
+        self.prepared = None
+        return prepared
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
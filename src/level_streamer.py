@@ -0,0 +1,158 @@
+# File: src/level_streamer.py
+from collectible import Collectible
+from level_baker import BakedLevel
+from level_generator import LevelGenerator
+
+class LevelChunk:
+    """
+    The sprites of one loaded chunk of a StreamingLevel.
+    """
+
+    def __init__(self, index, platforms, enemies, collectibles):
+        self.index = index
+        self.platforms = platforms
+        self.enemies = enemies
+        self.collectibles = collectibles
+        # Baked platform surfaces, built the first time the chunk is drawn.
+        self.baked = None
+
+class StreamingLevel:
+    """
+    An endless level, generated one chunk (generator.screen_width pixels wide) at a time.
+
+    update() loads the chunks within load_distance of the player and evicts chunks
+    that fall more than evict_distance behind, or the farthest ones whenever more
+    than max_chunks are loaded (the memory budget). Chunks come from
+    LevelGenerator.generate_chunk, so an evicted chunk regenerates identically when
+    the player returns; collectibles already picked up are remembered and not
+    respawned. The level also serves as a static render layer for the Renderer.
+    Chunk sprites are taken from pool (a SpritePool) if one is given.
+    """
+
+    def __init__(self, generator, load_distance=800, evict_distance=2400, max_chunks=5, pool=None,
+                 chunk_width=None):
+        self.generator = generator
+        self.pool = pool
+        self.chunk_width = chunk_width or generator.screen_width
+        # Index of the last chunk, or None for an endless level.
+        self.last_chunk = None
+        self.load_distance = load_distance
+        self.evict_distance = evict_distance
+        self.max_chunks = max(max_chunks, 2 * load_distance // self.chunk_width + 2)
+        self.chunks = {}
+        # chunk index -> slots of the collectibles already picked up in that chunk.
+        self.collected = {}
+        self.chunks_generated = 0
+
+    @property
+    def sprite_count(self):
+        """Number of platforms currently loaded."""
+        return sum(len(chunk.platforms) for chunk in self.chunks.values())
+
+    def update(self, focus_x):
+        """
+        Loads and evicts chunks around focus_x (usually the player's x position).
+        Returns (loaded, evicted) lists of LevelChunk objects.
+        """
+        first = max(0, (focus_x - self.load_distance) // self.chunk_width)
+        last = max(0, (focus_x + self.load_distance) // self.chunk_width)
+        if self.last_chunk is not None:
+            last = min(last, self.last_chunk)
+        loaded = []
+        for index in range(first, last + 1):
+            if index not in self.chunks:
+                chunk = self.load_chunk(index)
+                self.chunks[index] = chunk
+                loaded.append(chunk)
+
+        evicted = []
+        focus_chunk = focus_x // self.chunk_width
+        for index in sorted(self.chunks, key=lambda i: -abs(i - focus_chunk)):
+            if first <= index <= last:
+                continue
+            behind = focus_x - (index + 1) * self.chunk_width
+            ahead = index * self.chunk_width - focus_x
+            if max(behind, ahead) > self.evict_distance or len(self.chunks) > self.max_chunks:
+                evicted.append(self.chunks.pop(index))
+        return loaded, evicted
+
+    def load_chunk(self, index):
+        """
+        Generates chunk index and builds its sprites, skipping collected collectibles.
+        """
+        platform_data, enemy_data, collectible_data = self.chunk_layout(index)
+        platforms, enemies, _ = LevelGenerator.build_sprites((platform_data, enemy_data, []), self.pool)
+        taken = self.collected.get(index, ())
+        collectibles = []
+        for slot, (x, y) in enumerate(collectible_data):
+            if slot not in taken:
+                col = Collectible(x, y) if self.pool is None else self.pool.acquire(Collectible, x, y)
+                col.chunk_index = index
+                col.chunk_slot = slot
+                collectibles.append(col)
+        return LevelChunk(index, platforms, enemies, collectibles)
+
+    def chunk_layout(self, index):
+        """
+        Returns the layout of chunk index, as LevelGenerator.generate_chunk does.
+        """
+        self.chunks_generated += 1
+        return self.generator.generate_chunk(index)
+
+    def mark_collected(self, collectible):
+        """
+        Remembers that a collectible was picked up so it stays gone after its chunk reloads.
+        """
+        self.collected.setdefault(collectible.chunk_index, set()).add(collectible.chunk_slot)
+
+    def draw(self, screen, world_rect, offset, scale=1.0):
+        """
+        Blits the baked platforms of the loaded chunks overlapping world_rect
+        (scaled by scale, see BakedLevel.draw). Returns the number of surfaces drawn.
+        """
+        drawn = 0
+        first = world_rect.left // self.chunk_width
+        last = (world_rect.right - 1) // self.chunk_width
+        for index in range(first, last + 1):
+            chunk = self.chunks.get(index)
+            if chunk is not None:
+                if chunk.baked is None:
+                    chunk.baked = BakedLevel(chunk.platforms)
+                drawn += chunk.baked.draw(screen, world_rect, offset, scale)
+        return drawn
+
+class FileStreamingLevel(StreamingLevel):
+    """
+    A level read from a LevelFile, streamed in chunks of chunk_width pixels like a
+    StreamingLevel, so only the sprites near the player are ever built. A chunk's
+    records are decoded from the file's mapping when it loads: platforms that span
+    several chunks are cut at the chunk edges, enemies belong to the chunk of their
+    spawn point and collectibles to the chunk of their center. The level owns
+    level_file and keeps it open until close().
+    """
+
+    def __init__(self, level_file, chunk_width, load_distance=800, evict_distance=2400, max_chunks=5, pool=None):
+        super().__init__(None, load_distance, evict_distance, max_chunks, pool, chunk_width)
+        self.file = level_file
+        self.last_chunk = max(0, (level_file.level_width - 1) // chunk_width)
+        self.platform_records, self.enemy_records, self.collectible_records = level_file.chunk_index(chunk_width)
+
+    def chunk_layout(self, index):
+        """
+        Returns the layout of chunk index, read from the file.
+        """
+        self.chunks_generated += 1
+        left = index * self.chunk_width
+        right = left + self.chunk_width
+        platforms = []
+        for record in self.platform_records.get(index, ()):
+            x, y, width, height, color = self.file.platform_record(record)
+            start, end = max(x, left), min(x + width, right)
+            if end > start:
+                platforms.append((start, y, end - start, height, color))
+        enemies = [self.file.enemy_record(record) for record in self.enemy_records.get(index, ())]
+        collectibles = [self.file.collectible_record(record) for record in self.collectible_records.get(index, ())]
+        return platforms, enemies, collectibles
+
+    def close(self):
+        self.file.close()
@@ -2,21 +2,21 @@
 import pygame
 import sys
 import os
-
-from player import Player
-from level_generator import LevelGenerator
-from collectible import Collectible
-
-# Screen (window) dimensions
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
-
-# Level (world) dimensions
-LEVEL_WIDTH = 1600
-LEVEL_HEIGHT = 1200
-
-# Ground level (y-coordinate for ground platform)
-GROUND_Y = LEVEL_HEIGHT - 50
+import time
+
+from simulation import GameSimulation, LEFT, RIGHT, JUMP, STOP, PAUSE
+from renderer import Renderer, sprite_position
+from level_baker import BakedLevel
+from text_cache import render_text
+from level_batch import load_level_layout, DEFAULT_PARAMS
+from profiler import FrameProfiler
+from animation_cache import animation_cache
+from asset_pack import open_pack
+from sprite_pool import sprite_pool
+from replay import ReplayRecorder
+from level_pipeline import LevelPipeline
+from memory import memory_report
+from settings import SCREEN_WIDTH, SCREEN_HEIGHT, LEVEL_WIDTH, LEVEL_HEIGHT, TICK_RATE, RENDER_FPS, MAX_CATCH_UP_TICKS, DIRTY_RECT_RENDERING, STREAMING_WORLD, VECTORIZED_ENEMIES, ENEMY_WAKE_DISTANCE, LEVEL_SEED, LEVEL_FILE, PROFILE_FRAMES, PROFILE_EXPORT_PREFIX, ASSET_PACK, RECORD_REPLAYS, REPLAY_DIR, RENDER_SCALE, DYNAMIC_RESOLUTION, FRAME_BUDGET_MS, SMOOTH_UPSCALE, LEVEL_PREPARE_SLICE_MS
 
 # Define a pause button rectangle (positioned in the top right corner)
 PAUSE_BUTTON_RECT = pygame.Rect(SCREEN_WIDTH - 110, 10, 100, 40)
@@ -41,25 +41,55 @@ class Camera:
         """Return a rect shifted by the camera's offset."""
         return target_rect.move(-self.camera_rect.x, -self.camera_rect.y)
 
-    def update(self, target):
-        """Center the camera on target (usually the player) and clamp within level bounds."""
-        x = target.rect.centerx - SCREEN_WIDTH // 2
-        y = target.rect.centery - SCREEN_HEIGHT // 2
+    def update(self, target, alpha=1.0):
+        """
+        Center the camera on target (usually the player) and clamp within level bounds.
+        alpha interpolates the target between its previous and current tick.
+        """
+        target_x, target_y = sprite_position(target, alpha)
+        x = target_x + target.rect.width // 2 - SCREEN_WIDTH // 2
+        y = target_y + target.rect.height // 2 - SCREEN_HEIGHT // 2
         x = max(0, min(x, self.level_width - SCREEN_WIDTH))
         y = max(0, min(y, self.level_height - SCREEN_HEIGHT))
-        self.camera_rect = pygame.Rect(x, y, SCREEN_WIDTH, SCREEN_HEIGHT)
+        # Move the existing rect rather than allocating a new one every frame.
+        self.camera_rect.topleft = (x, y)
+
+# --- Level Selection ---
+def choose_level():
+    """
+    Returns the GameSimulation level arguments (config) for the next game, which are
+    also what a replay records. Only reads files and generates data, so the level
+    pipeline runs it on a worker thread.
+    """
+    if STREAMING_WORLD:
+        config = dict(level_width=LEVEL_WIDTH, level_height=LEVEL_HEIGHT, streaming=True)
+    elif LEVEL_FILE:
+        # Play a level saved in the binary level format. The simulation opens it and
+        # builds sprites from its records only as the player comes near them.
+        config = dict(level_file=LEVEL_FILE)
+    else:
+        # Use a pre-generated level from the on-disk cache when one is available.
+        seed, layout = load_level_layout(LEVEL_SEED)
+        config = dict(DEFAULT_PARAMS, seed=seed, layout=layout)
+    config["vectorized_enemies"] = VECTORIZED_ENEMIES
+    config["enemy_wake_distance"] = ENEMY_WAKE_DISTANCE
+    return config
+
+# The next game's level, prepared while the current game or a menu is running.
+level_pipeline = LevelPipeline(choose_level, sprite_pool, slice_ms=LEVEL_PREPARE_SLICE_MS)
 
 # --- Main Menu ---
 def main_menu(screen, clock, font, large_font):
     while True:
         screen.fill((0, 0, 50))
-        title_text = large_font.render("Copilot Platformer Game", True, (255, 255, 0))
-        instr_text = font.render("Press ENTER to Start, ESC to Quit", True, (255, 255, 255))
+        title_text = render_text(large_font, "Copilot Platformer Game", (255, 255, 0))
+        instr_text = render_text(font, "Press ENTER to Start, ESC to Quit", (255, 255, 255))
         screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2,
                                  SCREEN_HEIGHT // 2 - 100))
         screen.blit(instr_text, (SCREEN_WIDTH // 2 - instr_text.get_width() // 2,
                                  SCREEN_HEIGHT // 2))
         pygame.display.flip()
+        level_pipeline.pump()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
@@ -74,13 +104,14 @@ def main_menu(screen, clock, font, large_font):
 def pause_menu(screen, clock, font, large_font):
     while True:
         screen.fill((30, 30, 30))
-        pause_text = large_font.render("Paused", True, (255, 255, 255))
-        instr_text = font.render("Press P to Resume  |  R to Restart  |  M for Main Menu", True, (255, 255, 255))
+        pause_text = render_text(large_font, "Paused", (255, 255, 255))
+        instr_text = render_text(font, "Press P to Resume  |  R to Restart  |  M for Main Menu", (255, 255, 255))
         screen.blit(pause_text, (SCREEN_WIDTH // 2 - pause_text.get_width() // 2,
                                   SCREEN_HEIGHT // 2 - 100))
         screen.blit(instr_text, (SCREEN_WIDTH // 2 - instr_text.get_width() // 2,
                                   SCREEN_HEIGHT // 2))
         pygame.display.flip()
+        level_pipeline.pump()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
@@ -98,15 +129,16 @@ def game_over_menu(screen, clock, font, large_font, win):
     while True:
         screen.fill((0, 0, 0))
         if win:
-            result_text = large_font.render("You Win!", True, (0, 255, 0))
+            result_text = render_text(large_font, "You Win!", (0, 255, 0))
         else:
-            result_text = large_font.render("Game Over", True, (255, 0, 0))
-        instr_text = font.render("Press R to Restart or M for Main Menu", True, (255, 255, 255))
+            result_text = render_text(large_font, "Game Over", (255, 0, 0))
+        instr_text = render_text(font, "Press R to Restart or M for Main Menu", (255, 255, 255))
         screen.blit(result_text, (SCREEN_WIDTH // 2 - result_text.get_width() // 2,
                                   SCREEN_HEIGHT // 2 - 100))
         screen.blit(instr_text, (SCREEN_WIDTH // 2 - instr_text.get_width() // 2,
                                  SCREEN_HEIGHT // 2))
         pygame.display.flip()
+        level_pipeline.pump()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
@@ -119,34 +151,60 @@ def game_over_menu(screen, clock, font, large_font, win):
 
 # --- Main Game Loop (run_game) ---
 def run_game(screen, clock, font, large_font):
-    # Set spawn near the ground.
-    player_spawn_y = GROUND_Y - 80
-    player = Player(100, player_spawn_y)
-    player.health = 5
-    player.invulnerable = False
-    player.invulnerable_timer = 0
-
-    all_sprites = pygame.sprite.Group()
-    all_sprites.add(player)
-
-    level_gen = LevelGenerator(LEVEL_WIDTH, LEVEL_HEIGHT, GROUND_Y, num_platforms=10, enemy_chance=0.6)
-    platform_sprites, enemy_sprites = level_gen.generate_level()
-    all_sprites.add(platform_sprites)
-    all_sprites.add(enemy_sprites)
+    # Per-phase frame timings: F3 toggles them and their overlay, F4 exports them.
+    profiler = FrameProfiler(enabled=PROFILE_FRAMES)
+    profiler_font = pygame.font.SysFont("monospace", 14)
+    # All game logic lives in the simulation; this loop feeds it input and draws it.
+    # The level was prepared in the background (or is finished now if it isn't yet).
+    prepared = level_pipeline.take()
+    config = prepared.config
+    # The previous game's sprites are no longer used; the level after this one is built from them.
+    sprite_pool.release_all(keep=prepared.sprites())
+    sim = GameSimulation(**config, level_sprites=prepared.level_sprites, profiler=profiler, pool=sprite_pool)
+    player = sim.player
+    level_pipeline.start()
+
+    recorder = None
+    if RECORD_REPLAYS:
+        # The simulation picks a seed for streaming levels, so record the one it used.
+        config["seed"] = sim.seed
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        replay_path = os.path.join(REPLAY_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{sim.seed}.replay")
+        recorder = sim.recorder = ReplayRecorder(replay_path, config)
+
+    camera = Camera(sim.level_width, sim.level_height)
+    if sim.level is not None:
+        # A streaming level bakes its own platforms chunk by chunk.
+        static_layer = sim.level
+    elif prepared.baked is not None:
+        # Platforms never move, so they were composited into a few large chunks in advance.
+        static_layer = prepared.baked
+    else:
+        static_layer = BakedLevel(sim.platform_sprites)
+    # Draw only what the camera can see, using the simulation's spatial indexes.
+    renderer = Renderer([sim.enemy_index, sim.collectible_hash], always_drawn=[player],
+                        static_layers=[static_layer], dirty=DIRTY_RECT_RENDERING, render_scale=RENDER_SCALE,
+                        dynamic_resolution=DYNAMIC_RESOLUTION, frame_budget_ms=FRAME_BUDGET_MS,
+                        smooth_upscale=SMOOTH_UPSCALE)
+
+    # The pause button never changes, so draw it once.
+    pause_button = pygame.Surface(PAUSE_BUTTON_RECT.size)
+    pause_button.fill((50, 50, 50))
+    pause_label = render_text(font, "Pause (P)", (255, 255, 255))
+    pause_button.blit(pause_label, (PAUSE_BUTTON_RECT.width // 2 - pause_label.get_width() // 2,
+                                    PAUSE_BUTTON_RECT.height // 2 - pause_label.get_height() // 2))
+    hud_spacing = font.size("    ")[0]
+
+    # Fixed-timestep loop: the simulation always advances in 1/TICK_RATE steps, however
+    # fast frames are rendered, and rendering interpolates between the last two ticks.
+    tick_ms = 1000 / TICK_RATE
+    accumulator = 0.0
+    clock.tick()
+
+    while not sim.game_over:
+        frame_start = time.perf_counter()
+        profiler.begin_frame()
 
-    collectible_sprites = pygame.sprite.Group()
-    for platform in platform_sprites:
-        if platform.rect.top < GROUND_Y:
-            col = Collectible(platform.rect.centerx, platform.rect.top - 10)
-            collectible_sprites.add(col)
-    all_sprites.add(collectible_sprites)
-    total_collectibles = len(collectible_sprites)
-
-    camera = Camera(LEVEL_WIDTH, LEVEL_HEIGHT)
-    win = False
-    game_over = False
-
-    while not game_over:
         # Process events.
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -154,91 +212,116 @@ def run_game(screen, clock, font, large_font):
             # Pause key handling.
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_p:
+                    sim.push_input(PAUSE)
                     pause_choice = pause_menu(screen, clock, font, large_font)
                     if pause_choice in ['restart', 'menu']:
+                        if recorder is not None:
+                            recorder.close()
+                        sim.close()
                         return pause_choice
+                    # The menu drew over the whole screen.
+                    renderer.invalidate()
+                    # Don't count the time spent paused.
+                    frame_start = time.perf_counter()
+                    profiler.begin_frame()
             # Also check for mouse clicks on the pause button.
             if event.type == pygame.MOUSEBUTTONDOWN:
                 pos = pygame.mouse.get_pos()
                 if PAUSE_BUTTON_RECT.collidepoint(pos):
+                    sim.push_input(PAUSE)
                     pause_choice = pause_menu(screen, clock, font, large_font)
                     if pause_choice in ['restart', 'menu']:
+                        if recorder is not None:
+                            recorder.close()
+                        sim.close()
                         return pause_choice
+                    renderer.invalidate()
+                    frame_start = time.perf_counter()
+                    profiler.begin_frame()
+
+            # Profiler and memory report controls.
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    profiler.toggle()
+                elif event.key == pygame.K_F4:
+                    profiler.export_json(f"{PROFILE_EXPORT_PREFIX}.json")
+                    profiler.export_csv(f"{PROFILE_EXPORT_PREFIX}.csv")
+                    print(f"Frame profile written to {PROFILE_EXPORT_PREFIX}.json and .csv")
+                elif event.key == pygame.K_F5:
+                    # Memory held by surfaces (and the Python heap, if tracemalloc is on).
+                    print("\n".join(memory_report(renderer)))
 
             # Regular controls.
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_LEFT:
-                    player.go_left()
+                    sim.push_input(LEFT)
                 elif event.key == pygame.K_RIGHT:
-                    player.go_right()
+                    sim.push_input(RIGHT)
                 elif event.key == pygame.K_SPACE:
-                    player.jump()
+                    sim.push_input(JUMP)
             if event.type == pygame.KEYUP:
                 if event.key in [pygame.K_LEFT, pygame.K_RIGHT]:
-                    player.stop()
-
-        # Update sprites.
-        player.update()
-        enemy_sprites.update()
-
-        # Platform collision.
-        if player.change_y >= 0:
-            collisions = pygame.sprite.spritecollide(player, platform_sprites, False)
-            for platform in collisions:
-                if player.rect.bottom >= platform.rect.top and \
-                   player.rect.bottom - player.change_y <= platform.rect.top:
-                    player.rect.bottom = platform.rect.top
-                    player.change_y = 0
-                    player.on_ground = True
-                    break
-            else:
-                player.on_ground = False
+                    sim.push_input(STOP)
+        profiler.mark("events")
+
+        # Advance the game logic by as many ticks as real time requires. Under heavy load
+        # at most MAX_CATCH_UP_TICKS run per frame and the rest of the backlog is dropped,
+        # so the game slows down instead of spiralling.
+        accumulator += clock.get_time()
+        collected_before = sim.collected
+        steps = 0
+        while accumulator >= tick_ms and steps < MAX_CATCH_UP_TICKS and not sim.game_over:
+            sim.step()
+            accumulator -= tick_ms
+            steps += 1
+        if steps == MAX_CATCH_UP_TICKS:
+            accumulator = min(accumulator, tick_ms)
+        if sim.collected > collected_before:
+            print(f"Collected {sim.collected - collected_before} item(s)!")
+        alpha = min(accumulator / tick_ms, 1.0)
+        profiler.mark("sim: other")
+
+        camera.update(player, alpha)
+        profiler.mark("camera")
+
+        # HUD with health and collectible count, as separately cached segments so
+        # only a segment whose value changed is rasterized again.
+        hp_text = render_text(font, f"HP: {player.health}", (255, 255, 255))
+        if sim.total_collectibles == 0:
+            collectibles_text = render_text(font, f"Collectibles: {sim.collected}", (255, 255, 255))
         else:
-            player.on_ground = False
-
-        # Enemy collision using the custom hitbox callback.
-        if pygame.sprite.spritecollide(player, enemy_sprites, False,
-                                       collided=lambda p, e: p.rect.colliderect(e.hitbox)):
-            if not player.invulnerable:
-                player.health -= 1
-                player.set_animation("hurt")
-                player.invulnerable = True
-                player.invulnerable_timer = pygame.time.get_ticks()
-        if player.invulnerable and pygame.time.get_ticks() - player.invulnerable_timer > 2000:
-            player.invulnerable = False
-
-        if player.health <= 0:
-            game_over = True
-
-        # Collectible collisions.
-        collected = pygame.sprite.spritecollide(player, collectible_sprites, True)
-        if collected:
-            print(f"Collected {len(collected)} item(s)!")
-        if len(collectible_sprites) == 0 and total_collectibles > 0:
-            win = True
-            game_over = True
-
-        camera.update(player)
-
-        # Render scene.
-        screen.fill((100, 150, 200))
-        for sprite in all_sprites:
-            screen.blit(sprite.image, camera.apply(sprite.rect))
-
-        # Draw HUD with health and collectible count.
-        hud_text = font.render(f"HP: {player.health}    Collectibles: {total_collectibles - len(collectible_sprites)}/{total_collectibles}", True, (255, 255, 255))
-        screen.blit(hud_text, (10, 10))
-
-        # Draw the pause button on screen.
-        pygame.draw.rect(screen, (50, 50, 50), PAUSE_BUTTON_RECT)
-        pause_label = font.render("Pause (P)", True, (255, 255, 255))
-        screen.blit(pause_label, (PAUSE_BUTTON_RECT.centerx - pause_label.get_width() // 2,
-                                  PAUSE_BUTTON_RECT.centery - pause_label.get_height() // 2))
-
-        pygame.display.flip()
-        clock.tick(60)
-
-    return game_over_menu(screen, clock, font, large_font, win)
+            collectibles_text = render_text(font, f"Collectibles: {sim.collected}/{sim.total_collectibles}", (255, 255, 255))
+        overlays = [(hp_text, (10, 10)),
+                    (collectibles_text, (10 + hp_text.get_width() + hud_spacing, 10)),
+                    (pause_button, PAUSE_BUTTON_RECT.topleft)]
+        if profiler.enabled:
+            # Counts are from the previous draw.
+            counts = (f"sprites {renderer.visible_count}/{renderer.total_count}  "
+                      f"chunks {renderer.chunk_count}  dirty {renderer.dirty_count}")
+            overlays.extend(profiler.overlay(profiler_font, extra_lines=[counts]))
+        profiler.mark("hud")
+
+        # Render scene, HUD and pause button.
+        dirty_rects = renderer.draw(screen, camera, overlays, alpha)
+        profiler.mark("render")
+        if dirty_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty_rects)
+        profiler.mark("present")
+        # Frame time without the wait for the frame cap, for dynamic resolution.
+        renderer.frame_time((time.perf_counter() - frame_start) * 1000)
+        # A slice of work on the next level, out of the time left before the frame cap.
+        level_pipeline.pump()
+        profiler.mark("next level")
+        clock.tick(RENDER_FPS)
+        profiler.mark("idle")
+        profiler.end_frame()
+
+    if recorder is not None:
+        recorder.close()
+    sim.close()
+    return game_over_menu(screen, clock, font, large_font, sim.win)
 
 # --- Main Function (State Machine) ---
 def main():
@@ -248,6 +331,10 @@ def main():
     clock = pygame.time.Clock()
     font = pygame.font.SysFont("Arial", 24)
     large_font = pygame.font.SysFont("Arial", 48)
+    # Use the baked animation frames when the build ships them.
+    animation_cache.pack = open_pack(resource_path(ASSET_PACK), resource_path(""))
+    # Start on the first level while the main menu is up.
+    level_pipeline.start()
 
     state = main_menu(screen, clock, font, large_font)
     while True:
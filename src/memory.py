@@ -0,0 +1,290 @@
+# File: src/memory.py
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from types import SimpleNamespace
+
+import pygame
+
+from animation_cache import animation_cache
+from text_cache import text_cache
+from sprite_pool import sprite_pool
+from player import Player
+from enemy import Enemy
+from platform import Platform, color_sheets
+from collectible import Collectible
+
+# Sprite classes and the owner their surfaces are reported under.
+SPRITE_OWNERS = ((Player, "player"), (Enemy, "enemy"), (Platform, "platform"), (Collectible, "collectible"))
+
+def surface_bytes(surface):
+    """
+    Returns the bytes of pixel memory a surface holds (its pitch times its height).
+    Subsurfaces share their parent's pixels and count as 0.
+    """
+    if surface.get_parent() is not None:
+        return 0
+    return surface.get_pitch() * surface.get_height()
+
+def sprite_surfaces(sprite):
+    """
+    Yields every surface a sprite holds: its image, plus all its animation frames.
+    """
+    yield sprite.image
+    for frames in getattr(sprite, "animations", {}).values():
+        yield from frames
+
+def game_surfaces(pools=(sprite_pool,), sprites=(), renderer=None, backgrounds=()):
+    """
+    Collects the surfaces the game holds, as a dict of owner -> iterable of surfaces:
+    the sprites of pools (in use or free) and sprites by class (platforms by the
+    color sheets their images are cut from), the baked level chunks and offscreen
+    surfaces of renderer, the scaled backgrounds cached (or prefetched) by the
+    DynamicAssetGenerators in backgrounds, the text cache, and any animation
+    frames still cached but used by no sprite.
+    """
+    all_sprites = list(sprites)
+    for pool in pools:
+        all_sprites.extend(pool.in_use)
+        for free in pool.free.values():
+            all_sprites.extend(free)
+
+    owners = {owner: [] for _, owner in SPRITE_OWNERS}
+    owners["other sprites"] = []
+    for sprite in all_sprites:
+        for cls, owner in SPRITE_OWNERS:
+            if isinstance(sprite, cls):
+                break
+        else:
+            owner = "other sprites"
+        owners[owner].extend(sprite_surfaces(sprite))
+    owners["platform"].extend(color_sheets.values())
+
+    owners["level"] = []
+    owners["renderer"] = []
+    if renderer is not None:
+        for layer in renderer.static_layers:
+            # A BakedLevel, or a StreamingLevel with one per loaded chunk.
+            baked_levels = [chunk.baked for chunk in getattr(layer, "chunks", {}).values()
+                            if hasattr(chunk, "baked")] or [layer]
+            for baked in baked_levels:
+                if baked is not None:
+                    owners["level"].extend(baked.chunks.values())
+                    owners["level"].extend(baked.scaled_chunks.values())
+        if renderer.target is not None:
+            owners["renderer"].append(renderer.target)
+        owners["renderer"].extend(renderer.scaled_images.values())
+
+    owners["background"] = []
+    for generator in backgrounds:
+        owners["background"].extend(generator.cache.values())
+        owners["background"].extend(future.result() for future in list(generator.pending.values())
+                                    if future.done() and future.exception() is None)
+
+    owners["text"] = list(text_cache.entries.values())
+    owners["animation cache"] = [frame for frames in animation_cache.entries.values() for frame in frames]
+    return owners
+
+def surface_usage(owners):
+    """
+    Returns {owner: {"surfaces": count, "bytes": pixel bytes}} for a dict of owner ->
+    surfaces, with "total" added. A surface shared by several owners (like the
+    animation frames every enemy refers to) is counted once, for the first owner.
+    """
+    seen = set()
+    usage = {}
+    for owner, surfaces in owners.items():
+        count = total = 0
+        for surface in surfaces:
+            if id(surface) in seen:
+                continue
+            seen.add(id(surface))
+            count += 1
+            total += surface_bytes(surface)
+        usage[owner] = {"surfaces": count, "bytes": total}
+    usage["total"] = {"surfaces": sum(entry["surfaces"] for entry in usage.values()),
+                      "bytes": sum(entry["bytes"] for entry in usage.values())}
+    return usage
+
+def module_name(filename):
+    """
+    Returns a short name for the source file of an allocation: the file name for
+    the game's own modules, the top-level package for installed ones.
+    """
+    parts = os.path.normpath(filename).split(os.sep)
+    if "site-packages" in parts:
+        return parts[parts.index("site-packages") + 1]
+    if parts[-1] == "__init__.py" and len(parts) > 1:
+        return parts[-2]
+    return parts[-1]
+
+def module_totals(snapshot):
+    """
+    Returns {module: (bytes, blocks)} for the allocations of a tracemalloc snapshot.
+    """
+    totals = {}
+    for stat in snapshot.statistics("filename"):
+        name = module_name(stat.traceback[0].filename)
+        size, count = totals.get(name, (0, 0))
+        totals[name] = (size + stat.size, count + stat.count)
+    return totals
+
+def python_usage(snapshot, limit=15):
+    """
+    Returns the Python heap allocations of a tracemalloc snapshot grouped by module,
+    as (module, bytes, blocks) tuples, largest first. Pixel memory allocated by SDL
+    is not visible to tracemalloc; surface_usage accounts for it.
+    """
+    ranked = sorted(((name, size, count) for name, (size, count) in module_totals(snapshot).items()),
+                    key=lambda entry: entry[1], reverse=True)
+    return ranked[:limit]
+
+def resident_bytes():
+    """
+    Returns the resident set size of the process, or None where it can't be read.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def format_report(usage, modules=None):
+    """
+    Formats surface_usage (and optionally python_usage) results as text lines.
+    """
+    lines = [f"{'surfaces by owner':<22}{'count':>8}{'KiB':>10}"]
+    for owner, entry in usage.items():
+        lines.append(f"{owner:<22}{entry['surfaces']:>8}{entry['bytes'] / 1024:>10.1f}")
+    if modules:
+        lines.append(f"{'python heap by module':<22}{'blocks':>8}{'KiB':>10}")
+        for name, size, count in modules:
+            lines.append(f"{name:<22}{count:>8}{size / 1024:>10.1f}")
+    rss = resident_bytes()
+    if rss is not None:
+        lines.append(f"{'resident set':<30}{rss / 1024:>10.1f}")
+    return lines
+
+def memory_report(renderer=None, backgrounds=()):
+    """
+    Returns the text lines of a report on the running game's memory: surfaces by
+    owner, plus the Python heap by module when tracemalloc is tracing (e.g. with
+    python -X tracemalloc).
+    """
+    modules = python_usage(tracemalloc.take_snapshot()) if tracemalloc.is_tracing() else None
+    return format_report(surface_usage(game_surfaces(renderer=renderer, backgrounds=backgrounds)), modules)
+
+def leak_check(restarts=50, warmup=10, ticks=300, seeds=range(5), tolerance_kb=256):
+    """
+    Restarts a headless game restarts times, the way run_game does (the next level
+    prepared by a LevelPipeline, the previous one's sprites released to the shared
+    pool, a frame rendered), playing ticks ticks of each and cycling through the
+    levels of seeds. After warmup restarts (enough to see every level, so pools and
+    caches reach their steady size) the Python heap, the surfaces the game holds
+    and the resident set must not grow by more than tolerance_kb. Each is compared
+    as its lowest value over the first and the last quarter of the restarts, as the
+    resident set swings by a few hundred KiB from one restart to the next.
+
+    Returns a dict with the growth of each and "ok".
+    """
+    # Imported here so this module can be imported without the simulation.
+    from simulation import GameSimulation, random_inputs
+    from level_batch import DEFAULT_PARAMS, generate_layout
+    from level_pipeline import LevelPipeline
+    from renderer import Renderer
+    from settings import SCREEN_WIDTH, SCREEN_HEIGHT
+
+    seeds = list(seeds)
+    layouts = {seed: generate_layout(seed, DEFAULT_PARAMS) for seed in seeds}
+    count = [0]
+
+    def choose_level():
+        seed = seeds[count[0] % len(seeds)]
+        count[0] += 1
+        return dict(DEFAULT_PARAMS, seed=seed, layout=layouts[seed])
+
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    camera = SimpleNamespace(camera_rect=screen.get_rect())
+    pipeline = LevelPipeline(choose_level, sprite_pool)
+    sprite_pool.release_all()
+
+    def play(restart):
+        prepared = pipeline.take()
+        sprite_pool.release_all(keep=prepared.sprites())
+        sim = GameSimulation(**prepared.config, level_sprites=prepared.level_sprites, pool=sprite_pool,
+                             inputs=random_inputs(restart))
+        pipeline.start()
+        renderer = Renderer([sim.enemy_index, sim.collectible_hash], always_drawn=[sim.player],
+                            static_layers=[prepared.baked])
+        sim.step(ticks)
+        pipeline.pump(float("inf"))
+        camera.camera_rect.center = sim.player.rect.center
+        renderer.draw(screen, camera)
+        return renderer
+
+    tracemalloc.start()
+    try:
+        samples = []
+        for restart in range(restarts):
+            renderer = play(restart)
+            if restart + 1 >= warmup:
+                gc.collect()
+                surfaces = surface_usage(game_surfaces(renderer=renderer))["total"]["bytes"]
+                resident = resident_bytes()
+                # Only the per-module totals are kept, as whole snapshots would add to the resident set.
+                totals = module_totals(tracemalloc.take_snapshot()) if restart + 1 in (warmup, restarts) else None
+                samples.append((tracemalloc.get_traced_memory()[0], surfaces, resident, totals))
+            del renderer
+    finally:
+        tracemalloc.stop()
+        pipeline.shutdown()
+        sprite_pool.release_all()
+
+    window = max(1, len(samples) // 4)
+
+    def growth_kb(field):
+        if samples[0][field] is None:
+            return None
+        return (min(sample[field] for sample in samples[-window:]) -
+                min(sample[field] for sample in samples[:window])) / 1024
+
+    result = {
+        "restarts": restarts,
+        "python_growth_kb": growth_kb(0),
+        "surface_growth_kb": growth_kb(1),
+        "resident_growth_kb": growth_kb(2),
+    }
+    result["ok"] = all(growth is None or growth <= tolerance_kb
+                       for growth in (result["python_growth_kb"], result["surface_growth_kb"],
+                                      result["resident_growth_kb"]))
+    # Where the Python heap grew, by module.
+    first, last = samples[0][3], samples[-1][3]
+    growth = [(name, size - first.get(name, (0, 0))[0]) for name, (size, _) in last.items()]
+    result["python_growth_by_module"] = sorted((entry for entry in growth if entry[1] > 0),
+                                               key=lambda entry: entry[1], reverse=True)[:10]
+    return result
+
+if __name__ == "__main__":
+    from simulation import init_headless
+
+    parser = argparse.ArgumentParser(description="Report the game's memory use and check restarts for leaks.")
+    parser.add_argument("--restarts", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--ticks", type=int, default=300, help="ticks played per game")
+    parser.add_argument("--tolerance-kb", type=float, default=256)
+    args = parser.parse_args()
+
+    init_headless()
+    result = leak_check(args.restarts, args.warmup, args.ticks, tolerance_kb=args.tolerance_kb)
+    print("\n".join(memory_report()))
+    print(f"After {result['restarts']} restarts: Python heap {result['python_growth_kb']:+.1f} KiB, "
+          f"surfaces {result['surface_growth_kb']:+.1f} KiB, resident set "
+          + ("n/a" if result["resident_growth_kb"] is None else f"{result['resident_growth_kb']:+.1f} KiB"))
+    for name, size in result["python_growth_by_module"]:
+        print(f"  {name:<28}{size / 1024:+10.1f} KiB")
+    if not result["ok"]:
+        print(f"Memory grew by more than {args.tolerance_kb} KiB across restarts")
+        sys.exit(1)
+    print("No growth across restarts")
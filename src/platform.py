@@ -1,11 +1,41 @@
 # File: src/platform.py
 import pygame
 
+# color -> a surface filled with that color. Platforms are solid rectangles, so
+# their images are subsurfaces of these: one block of pixels per color serves
+# every size, and a level's platforms (or a restart onto a new layout) allocate
+# no pixel memory beyond it.
+color_sheets = {}
+
+def color_sheet(color, width, height):
+    """
+    Returns the surface filled with color, grown to at least width x height.
+    """
+    sheet = color_sheets.get(color)
+    if sheet is None or sheet.get_width() < width or sheet.get_height() < height:
+        if sheet is not None:
+            width, height = max(width, sheet.get_width()), max(height, sheet.get_height())
+        # Subsurfaces of a sheet this replaces keep it alive for as long as they are used.
+        sheet = color_sheets[color] = pygame.Surface((width, height))
+        sheet.fill(color)
+    return sheet
+
 class Platform(pygame.sprite.Sprite):
     def __init__(self, x, y, width, height, color=(0, 255, 0)):
         super().__init__()
-        self.image = pygame.Surface((width, height))
-        self.image.fill(color)
-        self.rect = self.image.get_rect()
+        self.image = None
+        self.rect = pygame.Rect(x, y, width, height)
+        self.color = None
+        self.reset(x, y, width, height, color)
+
+    def reset(self, x, y, width, height, color=(0, 255, 0)):
+        """
+        Reinitializes the platform in place (see SpritePool). Its image is cut from
+        the shared sheet of its color, so a new size or color copies no pixels.
+        """
+        if self.image is None or color != self.color or self.image.get_size() != (width, height):
+            self.image = color_sheet(color, width, height).subsurface((0, 0, width, height))
+            self.rect.size = (width, height)
+            self.color = color
         self.rect.x = x
         self.rect.y = y
@@ -3,6 +3,8 @@ import pygame
 import os
 import sys
 
+from animation_cache import load_animation
+
 def resource_path(relative_path):
     """
     Get absolute path to resource, works for development and for PyInstaller.
@@ -30,25 +32,37 @@ class Player(pygame.sprite.Sprite):
         }
 
         self.animations = {}
+        # animation -> {facing: frames}, so update() needs no key building.
+        self.frame_tables = {}
         self.scale = (80, 80)  # Set a larger character size.
         # Loop through each animation type and load its frames.
         for anim, frame_count in self.animation_specs.items():
             # Build the path using resource_path to include bundled assets.
             path = resource_path(os.path.join("assets", "player", f"{anim}.png"))
-            frames = self.load_animation(path, frame_count, self.scale)
-            self.animations[anim] = frames
+            self.animations[anim] = self.load_animation(path, frame_count, self.scale)
             # Precompute the left-facing frames to avoid runtime flipping issues.
-            self.animations[anim + "_left"] = [pygame.transform.flip(frame, True, False) for frame in frames]
+            self.animations[anim + "_left"] = self.load_animation(path, frame_count, self.scale, flip=True)
+            self.frame_tables[anim] = {1: self.animations[anim], -1: self.animations[anim + "_left"]}
+
+        self.rect = self.animations["idle"][0].get_rect()
+        # Animation timing in seconds per frame.
+        self.animation_speed = 0.1
+        self.frame_ms = int(self.animation_speed * 1000)
+        self.reset(x, y)
 
+    def reset(self, x, y):
+        """
+        Reinitializes the player in place (see SpritePool): back to the idle
+        animation at (x, y), standing still and facing right.
+        """
         self.current_animation = "idle"
+        self.current_frames = self.frame_tables["idle"]
         self.current_frame = 0
+        # Clock time the current animation started at, set by the next update().
+        self.animation_start = None
         self.image = self.animations[self.current_animation][self.current_frame]
-        self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
-
-        # Animation timing in seconds per frame.
-        self.animation_speed = 0.1
-        self.last_update_time = pygame.time.get_ticks()
+        self.prev_pos = self.rect.topleft
 
         # Movement and physics attributes.
         self.change_x = 0
@@ -58,52 +72,39 @@ class Player(pygame.sprite.Sprite):
         # 1 indicates the sprite is facing right, -1 means left.
         self.facing = 1
 
-    def load_animation(self, path, frame_count, scale):
+    def load_animation(self, path, frame_count, scale, flip=False):
         """
-        Loads a sprite sheet from the given path and slices it into frame_count frames.
-        Each frame is then scaled to the desired size.
+        Returns the frames of the sprite sheet at path, sliced into frame_count frames
+        and scaled to the desired size. Frames come from the shared animation cache,
+        so the sheet is only decoded once per process.
         """
-        frames = []
-        try:
-            sheet = pygame.image.load(path).convert_alpha()
-        except Exception as e:
-            print(f"Error loading animation from {path}: {e}")
-            fallback = pygame.Surface(scale)
-            fallback.fill((255, 0, 0))
-            return [fallback]
-
-        sheet_width, sheet_height = sheet.get_size()
-        frame_width = sheet_width // frame_count
-        for i in range(frame_count):
-            frame_rect = (i * frame_width, 0, frame_width, sheet_height)
-            frame = sheet.subsurface(frame_rect)
-            # Scale the frame to the desired size.
-            frame = pygame.transform.scale(frame, scale)
-            frames.append(frame)
-        return frames
+        return load_animation(path, frame_count, scale, flip, fallback_color=(255, 0, 0))
 
     def set_animation(self, animation):
         """
         If the desired animation is different from the current one,
-        switch to it and reset the frame counter.
+        switch to it and restart it from its first frame.
         """
-        if animation != self.current_animation and animation in self.animations:
+        if animation != self.current_animation and animation in self.frame_tables:
             self.current_animation = animation
+            self.current_frames = self.frame_tables[animation]
             self.current_frame = 0
-            self.last_update_time = pygame.time.get_ticks()
-
-    def update(self):
-        now = pygame.time.get_ticks()
-        if now - self.last_update_time > self.animation_speed * 1000:
-            self.last_update_time = now
-            self.current_frame = (self.current_frame + 1) % len(self.animations[self.current_animation])
+            self.animation_start = None
 
+    def update(self, now):
+        """
+        Advances the player by one tick. now is the animation clock in milliseconds
+        (GameSimulation passes its tick time), which picks the animation frame.
+        """
+        if self.animation_start is None:
+            self.animation_start = now
         # Use the precomputed flipped frames based on the facing direction.
-        if self.facing == -1:
-            current_anim = self.current_animation + "_left"
-        else:
-            current_anim = self.current_animation
-        self.image = self.animations[current_anim][self.current_frame]
+        frames = self.current_frames[self.facing]
+        self.current_frame = (now - self.animation_start) // self.frame_ms % len(frames)
+        self.image = frames[self.current_frame]
+
+        # Remember where this tick started, for render interpolation.
+        self.prev_pos = self.rect.topleft
 
         # Apply gravity and update position.
         self.change_y += 1
@@ -0,0 +1,132 @@
+# File: src/profiler.py
+import csv
+import json
+import time
+from collections import deque
+
+from text_cache import render_text
+
+def percentile(sorted_values, p):
+    """
+    Returns the p-th percentile (nearest rank) of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+class FrameProfiler:
+    """
+    Times the phases of each frame and keeps the last window frames for rolling statistics.
+
+    A frame is timed as a series of laps: begin_frame() starts the clock, each
+    mark(phase) charges the time since the previous mark to phase (a phase marked
+    several times in one frame, like the per-tick phases, adds up), and
+    end_frame() stores the frame. While disabled every call returns immediately,
+    so the marks can stay in the game loop.
+    """
+
+    def __init__(self, window=300, enabled=False):
+        self.enabled = enabled
+        self.frames = deque(maxlen=window)
+        # Phases in the order they were first marked, for the overlay and exports.
+        self.phases = []
+        self.current = None
+        self.frame_start = 0.0
+        self.last = 0.0
+        self.frame_count = 0
+        self.overlay_lines = []
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.current = {}
+        self.frame_start = self.last = time.perf_counter()
+
+    def mark(self, phase):
+        """
+        Charges the time since the previous mark (or begin_frame) to phase.
+        """
+        if not self.enabled or self.current is None:
+            return
+        now = time.perf_counter()
+        current = self.current
+        current[phase] = current.get(phase, 0.0) + (now - self.last) * 1000
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled or self.current is None:
+            return
+        current = self.current
+        for phase in current:
+            if phase not in self.phases:
+                self.phases.append(phase)
+        current["frame"] = (time.perf_counter() - self.frame_start) * 1000
+        self.frames.append(current)
+        self.frame_count += 1
+        self.current = None
+
+    def toggle(self):
+        """
+        Turns profiling on or off. Statistics are kept while off.
+        """
+        self.enabled = not self.enabled
+        self.current = None
+
+    def summary(self):
+        """
+        Returns {phase: {"mean", "p50", "p95", "p99", "max"}} in milliseconds over the
+        frames in the window, with "frame" for whole frames.
+        """
+        result = {}
+        for phase in self.phases + ["frame"]:
+            values = sorted(frame.get(phase, 0.0) for frame in self.frames)
+            if not values:
+                continue
+            result[phase] = {
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+            }
+        return result
+
+    def export_json(self, path):
+        """
+        Writes the summary and the per-frame timings in the window to path as JSON.
+        """
+        with open(path, "w") as f:
+            json.dump({"frames": len(self.frames), "summary": self.summary(),
+                       "phases": self.phases, "samples": list(self.frames)}, f, indent=2)
+
+    def export_csv(self, path):
+        """
+        Writes one row per frame in the window, one column per phase (milliseconds), to path.
+        """
+        columns = self.phases + ["frame"]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for frame in self.frames:
+                writer.writerow([f"{frame.get(phase, 0.0):.4f}" for phase in columns])
+
+    def overlay(self, font, position=(10, 50), refresh_frames=30, color=(255, 255, 0), extra_lines=()):
+        """
+        Returns (surface, position) overlays listing p50/p95/p99 per phase, followed
+        by extra_lines (e.g. the renderer's sprite counts), in the format
+        Renderer.draw takes. The text is only recomputed every refresh_frames
+        frames, so showing it doesn't cost a sort and a rasterization every frame.
+        """
+        if not self.overlay_lines or self.frame_count % refresh_frames == 0:
+            lines = [f"{'phase':<22}{'p50':>7}{'p95':>7}{'p99':>7}"]
+            for phase, stats in self.summary().items():
+                lines.append(f"{phase:<22}{stats['p50']:7.2f}{stats['p95']:7.2f}{stats['p99']:7.2f}")
+            lines.extend(extra_lines)
+            self.overlay_lines = lines
+        x, y = position
+        overlays = []
+        for line in self.overlay_lines:
+            surface = render_text(font, line, color)
+            overlays.append((surface, (x, y)))
+            y += surface.get_height()
+        return overlays
@@ -0,0 +1,280 @@
+# File: src/renderer.py
+import pygame
+
+# Render scales dynamic resolution steps through (fractions of the screen resolution).
+# 512 px level chunks scale to whole pixels at each of them, so chunks never leave seams.
+# Only integer upscales: at 0.75 the upscale alone cost more than drawing at 1.0.
+RESOLUTION_STEPS = (1.0, 0.5)
+
+def sprite_position(sprite, alpha=1.0):
+    """
+    Returns the sprite's top-left world position interpolated between its previous
+    tick (sprite.prev_pos, if it moves) and its current one by alpha (0 to 1).
+    """
+    x, y = sprite.rect.topleft
+    prev_pos = getattr(sprite, "prev_pos", None)
+    if prev_pos is None or alpha >= 1.0:
+        return x, y
+    prev_x, prev_y = prev_pos
+    return round(prev_x + (x - prev_x) * alpha), round(prev_y + (y - prev_y) * alpha)
+
+class Renderer:
+    """
+    Draws the world through a camera, blitting only the sprites near the view.
+
+    Instead of scanning every sprite, the renderer queries spatial indexes (the
+    SpatialHash objects the simulation already maintains for collisions) for
+    sprites intersecting the camera rect grown by margin. The margin must be at
+    least as large as the gap between an index's rect and the sprite's image
+    rect (10 px for the enemy hitbox index). Sprites in always_drawn (e.g. the
+    player) skip the query. Static geometry baked into BakedLevel chunks
+    (static_layers) is drawn first, then always_drawn, then each index in turn,
+    then the screen-space overlays (HUD).
+
+    With dirty=True the renderer only repaints the regions of the screen that
+    changed since the last frame (moved or re-animated sprites, changed
+    overlays) and returns them for pygame.display.update(). Whenever the camera
+    scrolls it falls back to a full redraw.
+
+    draw() takes an interpolation factor alpha, so that with a fixed simulation
+    rate moving sprites are drawn between their previous and current tick.
+
+    With render_scale below 1 the world is drawn into an offscreen surface at that
+    fraction of the screen's resolution, from pre-scaled copies of the sprite
+    images and level chunks, and then scaled up to the screen in one pass
+    (smoothscale if smooth_upscale); overlays are drawn afterwards at full
+    resolution so the HUD stays sharp. Dirty rects are not used then. With
+    dynamic_resolution, frame_time() steps render_scale down through
+    RESOLUTION_STEPS while frames take longer than frame_budget_ms, and back up
+    (never above the initial render_scale) once there is room for it. A step down
+    that doesn't make frames faster is undone, and the scale is not lowered past
+    it again.
+    """
+
+    def __init__(self, indexes, always_drawn=(), static_layers=(), margin=64, background=(100, 150, 200),
+                 dirty=False, render_scale=1.0, dynamic_resolution=False, frame_budget_ms=12.0,
+                 smooth_upscale=False):
+        self.indexes = list(indexes)
+        self.always_drawn = list(always_drawn)
+        self.static_layers = list(static_layers)
+        self.margin = margin
+        self.background = background
+        self.dirty = dirty
+        self.view_rect = pygame.Rect(0, 0, 0, 0)
+        # Counts from the last draw, for profiling and debug overlays.
+        self.visible_count = 0
+        self.total_count = 0
+        self.dirty_count = 0
+        # Static layer chunks blitted, which stand in for the platform sprites counted in total_count.
+        self.chunk_count = 0
+        # What was on screen last frame, used by dirty mode to find changed regions.
+        self.last_offset = None
+        self.last_sprites = {}
+        self.last_overlays = []
+        # Reduced resolution rendering.
+        self.render_scale = render_scale
+        self.max_scale = render_scale
+        self.dynamic_resolution = dynamic_resolution
+        self.frame_budget_ms = frame_budget_ms
+        self.smooth_upscale = smooth_upscale
+        self.frame_ms = None
+        self.frames_at_scale = 0
+        # (scale, frame_ms) before the last step down, until it has been checked.
+        self.step_from = None
+        # Lowest scale to step down to, raised when a step down didn't pay off.
+        self.min_scale = 0
+        self.target = None
+        self.scaled_images = {}
+
+    def set_render_scale(self, scale):
+        """
+        Changes the render resolution, dropping the surfaces scaled for the old one.
+        """
+        self.render_scale = scale
+        self.target = None
+        self.scaled_images.clear()
+        self.frame_ms = None
+        self.frames_at_scale = 0
+        self.step_from = None
+        # Dirty rects from another resolution are meaningless.
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Makes the next draw() repaint the whole screen, e.g. after a menu has drawn over it.
+        """
+        self.last_offset = None
+
+    def frame_time(self, frame_ms, settle_frames=30):
+        """
+        Reports how long the last frame took to produce (not counting the wait for the
+        frame cap). With dynamic_resolution this picks the render scale: after
+        settle_frames frames at a scale, it steps down if the average frame time is
+        over budget, or up if the frame time scaled by the extra pixels still fits.
+        Once a step down has settled, its frame time is compared with the one before
+        the step; if it is no faster the step is reverted and becomes the floor.
+        """
+        if not self.dynamic_resolution:
+            return
+        self.frames_at_scale += 1
+        if self.frames_at_scale == 1:
+            # The first frame at a scale also scales the images it draws.
+            return
+        self.frame_ms = frame_ms if self.frame_ms is None else self.frame_ms * 0.9 + frame_ms * 0.1
+        if self.frames_at_scale < settle_frames:
+            return
+        if self.step_from is not None:
+            scale, before_ms = self.step_from
+            self.step_from = None
+            if self.frame_ms >= before_ms:
+                self.min_scale = scale
+                self.set_render_scale(scale)
+                return
+        steps = [self.max_scale] + [scale for scale in RESOLUTION_STEPS if self.min_scale <= scale < self.max_scale]
+        i = steps.index(self.render_scale) if self.render_scale in steps else len(steps) - 1
+        if self.frame_ms > self.frame_budget_ms and i + 1 < len(steps):
+            before = (self.render_scale, self.frame_ms)
+            self.set_render_scale(steps[i + 1])
+            self.step_from = before
+        elif i > 0 and self.frame_ms * (steps[i - 1] / steps[i]) ** 2 < self.frame_budget_ms * 0.8:
+            self.set_render_scale(steps[i - 1])
+
+    def visible_sprites(self, camera):
+        """
+        Returns the sprites that intersect the camera rect (plus margin), in draw order.
+        """
+        return self.sprites_in(camera.camera_rect)
+
+    def sprites_in(self, world_rect):
+        """
+        Returns the sprites that may intersect world_rect (grown by margin), in draw order.
+        """
+        view = self.view_rect
+        view.update(world_rect)
+        view.inflate_ip(self.margin * 2, self.margin * 2)
+        sprites = list(self.always_drawn)
+        for index in self.indexes:
+            sprites.extend(index.query(view))
+        return sprites
+
+    def draw(self, screen, camera, overlays=(), alpha=1.0):
+        """
+        Renders the visible sprites shifted by the camera offset, followed by the
+        overlays, a sequence of (surface, screen position) pairs. Moving sprites
+        are interpolated by alpha between their previous and current tick.
+
+        Returns None when the whole screen was redrawn (present it with
+        pygame.display.flip()), otherwise the list of changed rects to pass to
+        pygame.display.update().
+        """
+        offset = camera.camera_rect.topleft
+        sprites = self.visible_sprites(camera)
+        self.visible_count = len(sprites)
+        self.chunk_count = 0
+        self.total_count = (len(self.always_drawn) + sum(len(index) for index in self.indexes)
+                            + sum(layer.sprite_count for layer in self.static_layers))
+        overlays = [(surface, surface.get_rect(topleft=pos)) for surface, pos in overlays]
+        offset_x, offset_y = offset
+        if alpha >= 1.0:
+            positions = {sprite: (sprite.rect.x - offset_x, sprite.rect.y - offset_y) for sprite in sprites}
+        else:
+            positions = {}
+            for sprite in sprites:
+                x, y = sprite_position(sprite, alpha)
+                positions[sprite] = (x - offset_x, y - offset_y)
+
+        if self.render_scale != 1.0:
+            self._draw_scaled(screen, camera.camera_rect, positions, offset, overlays)
+            return None
+        if not self.dirty:
+            self._draw_full(screen, camera.camera_rect, positions, offset, overlays)
+            return None
+
+        current = {sprite: (sprite.image, pygame.Rect(position, sprite.rect.size))
+                   for sprite, position in positions.items()}
+        if offset != self.last_offset:
+            # The camera scrolled, so every pixel changes anyway.
+            self._draw_full(screen, camera.camera_rect, positions, offset, overlays)
+            dirty_rects = None
+        else:
+            dirty_rects = self._changed_rects(current, overlays, screen.get_rect())
+            for rect in dirty_rects:
+                self._redraw_region(screen, rect, offset, overlays, current)
+            self.dirty_count = len(dirty_rects)
+
+        self.last_offset = offset
+        self.last_sprites = current
+        self.last_overlays = overlays
+        return dirty_rects
+
+    def _draw_full(self, screen, world_rect, positions, offset, overlays):
+        screen.fill(self.background)
+        for layer in self.static_layers:
+            self.chunk_count += layer.draw(screen, world_rect, offset)
+        screen.blits([(sprite.image, position) for sprite, position in positions.items()], False)
+        screen.blits([(surface, rect) for surface, rect in overlays], False)
+        self.dirty_count = 1
+
+    def _scaled_image(self, image):
+        scaled = self.scaled_images.get(image)
+        if scaled is None:
+            if len(self.scaled_images) > 4096:
+                # Images of sprites that are long gone; rebuild the ones still in use.
+                self.scaled_images.clear()
+            scale = self.render_scale
+            width, height = image.get_size()
+            scaled = self.scaled_images[image] = pygame.transform.scale(
+                image, (max(1, round(width * scale)), max(1, round(height * scale))))
+        return scaled
+
+    def _draw_scaled(self, screen, world_rect, positions, offset, overlays):
+        scale = self.render_scale
+        screen_width, screen_height = screen.get_size()
+        size = (max(1, round(screen_width * scale)), max(1, round(screen_height * scale)))
+        if self.target is None or self.target.get_size() != size:
+            self.target = pygame.Surface(size, 0, screen)
+        target = self.target
+        target.fill(self.background)
+        for layer in self.static_layers:
+            self.chunk_count += layer.draw(target, world_rect, offset, scale)
+        target.blits([(self._scaled_image(sprite.image), (round(x * scale), round(y * scale)))
+                      for sprite, (x, y) in positions.items()], False)
+        if self.smooth_upscale:
+            pygame.transform.smoothscale(target, (screen_width, screen_height), screen)
+        else:
+            pygame.transform.scale(target, (screen_width, screen_height), screen)
+        screen.blits([(surface, rect) for surface, rect in overlays], False)
+        self.dirty_count = 1
+
+    def _changed_rects(self, current, overlays, screen_rect):
+        changed = []
+        last_sprites = self.last_sprites
+        for sprite, (image, rect) in current.items():
+            previous = last_sprites.get(sprite)
+            if previous is None:
+                changed.append(rect)
+            elif previous[0] is not image or previous[1] != rect:
+                changed.append(rect.union(previous[1]))
+        for sprite, (image, rect) in last_sprites.items():
+            if sprite not in current:
+                changed.append(rect)
+        if overlays != self.last_overlays:
+            changed.extend(rect for surface, rect in self.last_overlays)
+            changed.extend(rect for surface, rect in overlays)
+        return [rect.clip(screen_rect) for rect in changed if rect.colliderect(screen_rect)]
+
+    def _redraw_region(self, screen, rect, offset, overlays, current):
+        offset_x, offset_y = offset
+        screen.set_clip(rect)
+        screen.fill(self.background, rect)
+        world_rect = rect.move(offset_x, offset_y)
+        for layer in self.static_layers:
+            self.chunk_count += layer.draw(screen, world_rect, offset)
+        for sprite in self.sprites_in(world_rect):
+            drawn = current.get(sprite)
+            if drawn is not None and rect.colliderect(drawn[1]):
+                screen.blit(drawn[0], drawn[1])
+        for surface, overlay_rect in overlays:
+            if rect.colliderect(overlay_rect):
+                screen.blit(surface, overlay_rect)
+        screen.set_clip(None)
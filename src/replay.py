@@ -0,0 +1,179 @@
+# File: src/replay.py
+import argparse
+import json
+import time
+from bisect import bisect_right
+
+from simulation import GameSimulation, ACTIONS, init_headless
+from sprite_pool import SpritePool
+from settings import TICK_RATE
+
+# File layout: JSON lines.
+#   {"version": 2, "config": {...}}         the GameSimulation arguments of the game
+#   {"inputs": [delta, action, ...]}        actions as pairs of (ticks since the previous
+#                                           action, index into ACTIONS), in order
+#   {"keyframe": tick, "state": {...}}      GameSimulation.snapshot() at the start of tick
+#   {"end": tick}                           number of ticks played
+# Inputs are flushed before every keyframe, so reading the file in order gives
+# every action up to the keyframe's tick.
+VERSION = 2
+
+class ReplayRecorder:
+    """
+    Records a game as its simulation config plus the actions of each tick, with a
+    full-state keyframe every keyframe_interval ticks so a replay can seek.
+
+    Pass it to GameSimulation as recorder=, with the same config the simulation was
+    built from. Lines are appended as the game runs, so a replay survives a crash
+    up to its last flushed line.
+    """
+
+    def __init__(self, path, config, keyframe_interval=5 * TICK_RATE, flush_actions=256):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.flush_actions = flush_actions
+        self.file = open(path, "w")
+        self.pending = []
+        self.last_action_tick = 0
+        self.ticks = 0
+        self._write({"version": VERSION, "config": config})
+
+    def _write(self, line):
+        self.file.write(json.dumps(line, separators=(",", ":")))
+        self.file.write("\n")
+
+    def _flush_inputs(self):
+        if self.pending:
+            self._write({"inputs": self.pending})
+            self.pending = []
+
+    def record(self, sim, actions):
+        """
+        Called by the simulation at the start of each tick with that tick's actions.
+        """
+        tick = sim.tick
+        if tick % self.keyframe_interval == 0:
+            self._flush_inputs()
+            self._write({"keyframe": tick, "state": sim.snapshot()})
+            self.file.flush()
+        for action in actions:
+            self.pending.extend((tick - self.last_action_tick, ACTIONS.index(action)))
+            self.last_action_tick = tick
+        if len(self.pending) >= 2 * self.flush_actions:
+            self._flush_inputs()
+        self.ticks = tick + 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._flush_inputs()
+        self._write({"end": self.ticks})
+        self.file.close()
+
+class ReplayPlayer:
+    """
+    Plays a recorded game back in a headless GameSimulation.
+
+    Opening a replay decodes its inputs and notes where each keyframe starts in the
+    file; keyframe states are only read when seek() needs them. seek(tick) restores
+    the nearest keyframe at or before tick and simulates the rest of the way, and
+    advance() runs ticks as fast as the simulation allows.
+    """
+
+    def __init__(self, path, pool=None):
+        self.path = path
+        self.pool = pool if pool is not None else SpritePool()
+        self.actions = {}
+        self.keyframes = []
+        self.keyframe_offsets = []
+        self.end = None
+        tick = 0
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != VERSION:
+                raise ValueError(f"{path} has unsupported replay version {header.get('version')}")
+            self.config = header["config"]
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if line.startswith(b'{"keyframe"'):
+                    # Only the tick is needed now; the state is read on seek.
+                    self.keyframes.append(int(line[len(b'{"keyframe":'):line.index(b",")]))
+                    self.keyframe_offsets.append(offset)
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash.
+                    break
+                if "inputs" in entry:
+                    inputs = entry["inputs"]
+                    for i in range(0, len(inputs), 2):
+                        tick += inputs[i]
+                        self.actions.setdefault(tick, []).append(ACTIONS[inputs[i + 1]])
+                elif "end" in entry:
+                    self.end = entry["end"]
+        if self.end is None:
+            self.end = max([tick + 1] + [keyframe + 1 for keyframe in self.keyframes])
+        self.sim = None
+        self.reset()
+
+    def reset(self):
+        """
+        Starts over from tick 0, returning the pooled sprites of the previous simulation.
+        """
+        self.pool.release_all()
+        self.sim = GameSimulation(**self.config, pool=self.pool)
+
+    def keyframe(self, index):
+        with open(self.path, "rb") as f:
+            f.seek(self.keyframe_offsets[index])
+            return json.loads(f.readline())["state"]
+
+    def seek(self, tick):
+        """
+        Moves to the start of tick, restoring the nearest keyframe before it unless
+        simply playing on from the current tick is shorter.
+        """
+        index = bisect_right(self.keyframes, tick) - 1
+        keyframe_tick = self.keyframes[index] if index >= 0 else 0
+        if not keyframe_tick <= self.sim.tick <= tick:
+            self.reset()
+            if keyframe_tick > 0:
+                self.sim.restore(self.keyframe(index))
+        self.advance(tick - self.sim.tick)
+
+    def advance(self, ticks):
+        """
+        Plays up to ticks ticks with the recorded inputs (stopping at the end of the
+        recording or of the game). Returns the number of ticks played.
+        """
+        sim = self.sim
+        for i in range(ticks):
+            if sim.game_over or sim.tick >= self.end:
+                return i
+            for action in self.actions.get(sim.tick, ()):
+                sim.push_input(action)
+            sim.step()
+        return ticks
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play a recorded game back headless, as fast as possible.")
+    parser.add_argument("path")
+    parser.add_argument("--seek", type=int, default=None, help="tick to seek to before playing")
+    parser.add_argument("--ticks", type=int, default=None, help="ticks to play (default: to the end)")
+    args = parser.parse_args()
+
+    init_headless()
+    player = ReplayPlayer(args.path)
+    if args.seek is not None:
+        start = time.perf_counter()
+        player.seek(args.seek)
+        print(f"Seeked to tick {player.sim.tick} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    ticks = player.advance(args.ticks if args.ticks is not None else player.end - player.sim.tick)
+    elapsed = time.perf_counter() - start
+    print(f"Played {ticks} ticks in {elapsed:.3f}s ({ticks / max(elapsed, 1e-9) / TICK_RATE:.0f}x real time)")
+    print(player.sim.state()["player"])
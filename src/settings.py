@@ -0,0 +1,81 @@
+# File: src/settings.py
+
+# Screen (window) dimensions
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+
+# Level (world) dimensions
+LEVEL_WIDTH = 1600
+LEVEL_HEIGHT = 1200
+
+# Ground level (y-coordinate for ground platform)
+GROUND_Y = LEVEL_HEIGHT - 50
+
+# Simulation rate (game logic ticks per second)
+TICK_RATE = 60
+
+# Frame rate cap for rendering. The simulation keeps running at TICK_RATE,
+# so this can be lowered on weak machines without changing gameplay.
+RENDER_FPS = 60
+
+# Most simulation ticks run in one rendered frame before the game slows down
+# instead (avoids a "spiral of death" when ticks can't keep up).
+MAX_CATCH_UP_TICKS = 5
+
+# Fraction of the screen resolution the world is rendered at before being scaled
+# up to the window (e.g. 0.5 fills and blits a quarter of the pixels).
+RENDER_SCALE = 1.0
+
+# Lower the render scale automatically while frames take longer than
+# FRAME_BUDGET_MS to produce, and raise it again when they get faster.
+DYNAMIC_RESOLUTION = False
+FRAME_BUDGET_MS = 12.0
+
+# Upscale with smoothscale (filtered) instead of scale (nearest neighbour).
+SMOOTH_UPSCALE = False
+
+# Repaint only the changed parts of the screen while the camera is still
+# (helps on slow software blitters; falls back to full redraws while scrolling).
+DIRTY_RECT_RENDERING = False
+
+# Play an endless level generated in chunks around the player instead of a
+# single LEVEL_WIDTH-wide level.
+STREAMING_WORLD = False
+
+# Advance all enemy patrols in one NumPy batch (EnemySystem) instead of one
+# Enemy.update call per enemy. Requires NumPy.
+VECTORIZED_ENEMIES = False
+
+# Only update enemies whose patrol comes within this many pixels of the player;
+# the rest sleep and catch up exactly when they come near. It must cover the
+# screen around the player. None updates every enemy every tick.
+ENEMY_WAKE_DISTANCE = SCREEN_WIDTH
+
+# Main-thread time per frame (ms) spent building the next level's sprites while
+# the current level or a menu is running.
+LEVEL_PREPARE_SLICE_MS = 2.0
+
+# Directory of pre-generated level layouts (see level_batch.py).
+LEVEL_CACHE_DIR = "level_cache"
+
+# Play the level generated from this seed (e.g. a daily challenge) instead of a
+# random pre-generated one.
+LEVEL_SEED = None
+
+# Play the level stored in this binary level file (see level_format.py) instead
+# of a generated one.
+LEVEL_FILE = None
+
+# Time the phases of every frame from the start (F3 toggles this in game and shows
+# the timings; F4 writes them to PROFILE_EXPORT_PREFIX.json and .csv).
+PROFILE_FRAMES = False
+PROFILE_EXPORT_PREFIX = "frame_profile"
+
+# Pre-decoded animation frames, baked with asset_pack.py. Loaded at startup when
+# present, instead of decoding and scaling the PNG sprite sheets.
+ASSET_PACK = "assets/animations.pack"
+
+# Record every game to REPLAY_DIR (see replay.py), to reproduce bug reports or
+# replay real sessions as benchmarks.
+RECORD_REPLAYS = False
+REPLAY_DIR = "replays"
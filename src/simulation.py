@@ -0,0 +1,524 @@
+# File: src/simulation.py
+import argparse
+import math
+import os
+import random
+import time
+
+import pygame
+
+from player import Player
+from level_generator import LevelGenerator
+from spatial_hash import SpatialHash
+from level_streamer import StreamingLevel, FileStreamingLevel
+from level_format import LevelFile
+from profiler import FrameProfiler
+from sprite_pool import SpritePool
+from settings import LEVEL_WIDTH, LEVEL_HEIGHT, GROUND_Y, TICK_RATE
+
+# Input actions understood by GameSimulation (mirroring the keys run_game handles).
+LEFT = "left"
+RIGHT = "right"
+JUMP = "jump"
+STOP = "stop"
+# Opening the pause menu. It doesn't affect the simulation, but is kept in replays.
+PAUSE = "pause"
+ACTIONS = (LEFT, RIGHT, JUMP, STOP, PAUSE)
+
+# How long the player stays invulnerable after being hit (2 seconds).
+INVULNERABLE_TICKS = 2 * TICK_RATE
+
+def init_headless():
+    """
+    Initializes pygame with SDL's dummy video driver so the simulation can run
+    without a display (e.g. on CI machines). Sprite sheets still need a display
+    surface for convert_alpha(), so a tiny one is created if none exists.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))
+
+class GameSimulation:
+    """
+    The game logic of run_game, without a window, event queue or frame clock.
+
+    The simulation advances in fixed ticks. Each tick consumes the actions for
+    that tick, from the optional inputs iterable (one list of actions per tick)
+    and from push_input(), then updates the player, enemies, collisions and
+    collectibles. Given the same seed and inputs, two simulations end in the
+    same state.
+
+    With streaming=True the level is endless: chunks of level_width pixels are
+    generated around the player as it moves (see StreamingLevel), at most
+    max_chunks are kept loaded, and the game can only end by losing.
+
+    With level_file (the path of a level in the binary level format) the level's
+    size comes from the file, and its sprites are built from the file's records
+    chunk by chunk as the player comes near (see FileStreamingLevel). The file
+    stays open until close().
+
+    A pre-generated layout (from LevelGenerator.generate_layout, e.g. loaded from
+    the on-disk LevelCache) can be passed in to skip level generation, along with
+    its level_sprites (from build_sprites, e.g. prepared by a LevelPipeline) to
+    skip building them.
+
+    With vectorized_enemies=True (requires NumPy) enemy patrols are advanced in
+    one batched step by an EnemySystem instead of one Enemy.update call each.
+    enemy_index is whichever of the two answers enemy collision queries.
+
+    With enemy_wake_distance set, enemies further than that from the player (the
+    camera follows the player, so the distance should cover the screen) sleep:
+    enemy_patrols indexes them by the whole area their patrol covers, only those
+    whose patrol comes within the distance are updated, and a sleeping enemy is
+    caught up with Enemy.advance_patrol when it wakes, so the outcome is the same
+    as updating every enemy every tick. Ignored with vectorized_enemies.
+
+    If a FrameProfiler is given, each tick marks its phases on it.
+
+    Sprites are taken from pool (a SpritePool, e.g. the shared one, so a restart
+    reuses the previous level's sprites once they are released) and evicted
+    chunks are returned to it.
+
+    snapshot() and restore() capture and reinstate the complete game state, and a
+    recorder (see replay.ReplayRecorder) is shown the actions of every tick.
+    """
+
+    def __init__(self, seed=None, inputs=None, level_width=LEVEL_WIDTH, level_height=LEVEL_HEIGHT,
+                 ground_y=GROUND_Y, num_platforms=10, enemy_chance=0.6, streaming=False, max_chunks=5,
+                 vectorized_enemies=False, enemy_wake_distance=None, layout=None, level_sprites=None,
+                 profiler=None, pool=None, recorder=None, level_file=None):
+        if level_file is not None:
+            level_file = LevelFile(level_file)
+            level_width, level_height, ground_y = level_file.level_width, level_file.level_height, level_file.ground_y
+        if streaming and seed is None:
+            # Chunks must regenerate identically after eviction, so always seed them.
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.level_width = math.inf if streaming else level_width
+        self.level_height = level_height
+        self.ground_y = ground_y
+        self.inputs = iter(inputs) if inputs is not None else None
+        self.pending_inputs = []
+        # A disabled profiler ignores marks, so the tick needs no checks.
+        self.profiler = profiler or FrameProfiler()
+        self.pool = pool if pool is not None else SpritePool()
+        self.recorder = recorder
+
+        self.tick = 0
+        self.win = False
+        self.game_over = False
+        self.collected_count = 0
+        self.collected_last_tick = 0
+
+        # Set spawn near the ground.
+        self.player = self.pool.acquire(Player, 100, ground_y - 80)
+        self.player.health = 5
+        self.player.invulnerable = False
+        self.player.invulnerable_timer = 0
+
+        self.all_sprites = pygame.sprite.Group()
+        self.all_sprites.add(self.player)
+        self.platform_sprites = pygame.sprite.Group()
+        self.enemy_sprites = pygame.sprite.Group()
+        self.collectible_sprites = pygame.sprite.Group()
+
+        # Broad-phase indexes, so collision cost depends on local density rather than
+        # on the total number of entities. Enemies are filed once under their patrol
+        # area, which never moves, and tested by their hitbox, so moving them costs
+        # the index nothing.
+        self.platform_hash = SpatialHash()
+        self.enemy_hash = SpatialHash(rect_attr="patrol_rect", collide_attr="hitbox")
+        self.collectible_hash = SpatialHash()
+        if vectorized_enemies:
+            # Imported here so NumPy is only needed when the option is used.
+            from enemy_system import EnemySystem
+            self.enemy_system = EnemySystem()
+            self.enemy_index = self.enemy_system
+        else:
+            self.enemy_system = None
+            self.enemy_index = self.enemy_hash
+        self.enemy_wake_distance = None if vectorized_enemies else enemy_wake_distance
+        # Patrol areas never move, so this index is only touched as enemies come and go.
+        self.enemy_patrols = SpatialHash(cell_size=256, rect_attr="patrol_rect")
+        # enemy -> the tick it has been updated up to (sleeping enemies lag behind).
+        self.enemy_ticks = {}
+
+        level_gen = LevelGenerator(level_width, level_height, ground_y,
+                                   num_platforms=num_platforms, enemy_chance=enemy_chance, seed=seed)
+        if streaming:
+            self.level = StreamingLevel(level_gen, max_chunks=max_chunks, pool=self.pool)
+            self._stream_level()
+        elif level_file is not None:
+            self.level = FileStreamingLevel(level_file, min(level_width, LEVEL_WIDTH), max_chunks=max_chunks,
+                                            pool=self.pool)
+            self._stream_level()
+        else:
+            self.level = None
+            if level_sprites is None:
+                if layout is None:
+                    layout = level_gen.generate_layout()
+                level_sprites = level_gen.build_sprites(layout, self.pool)
+            # Kept in layout order, so snapshots can refer to sprites by position.
+            self.level_sprites = level_sprites
+            self.add_level_sprites(*self.level_sprites)
+        # An endless level has no fixed number of collectibles to win with.
+        if self.level is None:
+            self.total_collectibles = len(self.collectible_sprites)
+        elif level_file is not None:
+            self.total_collectibles = level_file.collectible_count
+        else:
+            self.total_collectibles = 0
+
+    def add_level_sprites(self, platforms, enemies, collectibles):
+        """
+        Adds level sprites to the simulation's groups and spatial indexes.
+        """
+        self.platform_sprites.add(platforms)
+        self.enemy_sprites.add(enemies)
+        self.collectible_sprites.add(collectibles)
+        self.all_sprites.add(platforms, enemies, collectibles)
+        self.platform_hash.add(platforms)
+        self.enemy_index.add(enemies)
+        self.collectible_hash.add(collectibles)
+        # Walk cycles start on arrival, whether or not the enemy is updated right away.
+        for enemy in enemies:
+            enemy.animation_start = self.tick * 1000 // TICK_RATE
+        if self.enemy_wake_distance is not None:
+            self.enemy_patrols.add(enemies)
+            for enemy in enemies:
+                self.enemy_ticks[enemy] = self.tick
+
+    def remove_level_sprites(self, platforms, enemies, collectibles):
+        """
+        Removes level sprites from the simulation's groups and spatial indexes.
+        """
+        for sprites, index in ((platforms, self.platform_hash), (enemies, self.enemy_index),
+                               (collectibles, self.collectible_hash)):
+            for sprite in sprites:
+                sprite.kill()
+                index.remove(sprite)
+        for enemy in enemies:
+            self.enemy_patrols.remove(enemy)
+            self.enemy_ticks.pop(enemy, None)
+
+    def _stream_level(self):
+        loaded, evicted = self.level.update(self.player.rect.centerx)
+        for chunk in evicted:
+            self.remove_level_sprites(chunk.platforms, chunk.enemies, chunk.collectibles)
+            for sprites in (chunk.platforms, chunk.enemies, chunk.collectibles):
+                self.pool.release(sprites)
+        for chunk in loaded:
+            self.add_level_sprites(chunk.platforms, chunk.enemies, chunk.collectibles)
+
+    @property
+    def collected(self):
+        """Number of collectibles picked up so far."""
+        return self.collected_count
+
+    def push_input(self, action):
+        """
+        Queues an action (LEFT, RIGHT, JUMP or STOP) for the next tick.
+        """
+        self.pending_inputs.append(action)
+
+    def step(self, n=1):
+        """
+        Advances the simulation by up to n ticks, stopping early when the game ends.
+        Returns the number of ticks that were actually simulated.
+        """
+        for i in range(n):
+            if self.game_over:
+                return i
+            self._tick()
+        return n
+
+    def _next_actions(self):
+        actions = self.pending_inputs
+        self.pending_inputs = []
+        if self.inputs is not None:
+            try:
+                actions.extend(next(self.inputs))
+            except StopIteration:
+                self.inputs = None
+        return actions
+
+    def _tick(self):
+        player = self.player
+        profiler = self.profiler
+
+        actions = self._next_actions()
+        if self.recorder is not None:
+            self.recorder.record(self, actions)
+
+        # Regular controls.
+        for action in actions:
+            if action == LEFT:
+                player.go_left()
+            elif action == RIGHT:
+                player.go_right()
+            elif action == JUMP:
+                player.jump()
+            elif action == STOP:
+                player.stop()
+        profiler.mark("sim: input")
+
+        # Update sprites. Animations follow the simulation's clock, read once per tick.
+        now = self.tick * 1000 // TICK_RATE
+        player.update(now)
+        profiler.mark("sim: player")
+        if self.level is not None:
+            self._stream_level()
+            profiler.mark("sim: streaming")
+        if self.enemy_system is not None:
+            self.enemy_system.step()
+        elif self.enemy_wake_distance is not None:
+            self._update_nearby_enemies(now)
+        else:
+            self.enemy_sprites.update(now)
+        profiler.mark("sim: enemies")
+
+        # Platform collision.
+        if player.change_y >= 0:
+            collisions = self.platform_hash.collide(player)
+            for platform in collisions:
+                if player.rect.bottom >= platform.rect.top and \
+                   player.rect.bottom - player.change_y <= platform.rect.top:
+                    player.rect.bottom = platform.rect.top
+                    player.change_y = 0
+                    player.on_ground = True
+                    break
+            else:
+                player.on_ground = False
+        else:
+            player.on_ground = False
+        profiler.mark("sim: platform collisions")
+
+        # Enemy collision against the hitbox index.
+        if self.enemy_index.collide(player):
+            if not player.invulnerable:
+                player.health -= 1
+                player.set_animation("hurt")
+                player.invulnerable = True
+                player.invulnerable_timer = self.tick
+        if player.invulnerable and self.tick - player.invulnerable_timer > INVULNERABLE_TICKS:
+            player.invulnerable = False
+
+        if player.health <= 0:
+            self.game_over = True
+        profiler.mark("sim: enemy collisions")
+
+        # Collectible collisions.
+        collected = self.collectible_hash.collide(player, dokill=True)
+        self.collected_last_tick = len(collected)
+        self.collected_count += len(collected)
+        if self.level is not None:
+            for col in collected:
+                self.level.mark_collected(col)
+            # Only the loaded chunks' collectibles are in the groups.
+            collected_all = self.collected_count == self.total_collectibles
+        else:
+            collected_all = len(self.collectible_sprites) == 0
+        if collected_all and self.total_collectibles > 0:
+            self.win = True
+            self.game_over = True
+        profiler.mark("sim: collectibles")
+
+        self.tick += 1
+
+    def _update_nearby_enemies(self, now):
+        distance = self.enemy_wake_distance
+        awake = self.enemy_patrols.query(self.player.rect.inflate(2 * distance, 2 * distance))
+        enemy_ticks = self.enemy_ticks
+        tick = self.tick
+        for enemy in awake:
+            # Catch up to the previous tick, then update as usual (animation, prev_pos).
+            enemy.advance_patrol(tick - enemy_ticks[enemy])
+            enemy.update(now)
+            enemy_ticks[enemy] = tick + 1
+
+    def wake_enemies(self):
+        """
+        Catches every sleeping enemy up with the current tick.
+        """
+        enemy_ticks = self.enemy_ticks
+        for enemy, tick in enemy_ticks.items():
+            if tick < self.tick:
+                # The last tick separately, to leave prev_pos as update() would.
+                enemy.advance_patrol(self.tick - tick - 1)
+                enemy.prev_pos = enemy.rect.topleft
+                enemy.advance_patrol(1)
+                enemy.animate((self.tick - 1) * 1000 // TICK_RATE)
+                enemy_ticks[enemy] = self.tick
+
+    def close(self):
+        """
+        Closes the level file of a level_file level. Nothing else needs releasing.
+        """
+        if isinstance(self.level, FileStreamingLevel):
+            self.level.close()
+
+    def snapshot(self):
+        """
+        Returns the complete game state as plain (JSON-serializable) data, for restore().
+        Pending inputs are not included.
+        """
+        player = self.player
+        if self.enemy_system is not None:
+            self.enemy_system.sync_all()
+        self.wake_enemies()
+        snapshot = {
+            "tick": self.tick,
+            "win": self.win,
+            "game_over": self.game_over,
+            "collected_count": self.collected_count,
+            "collected_last_tick": self.collected_last_tick,
+            "player": [player.rect.x, player.rect.y, player.prev_pos[0], player.prev_pos[1],
+                       player.change_x, player.change_y, player.on_ground, player.facing,
+                       player.current_animation, player.animation_start, player.health, player.invulnerable,
+                       player.invulnerable_timer],
+        }
+        if self.level is None:
+            platforms, enemies, collectibles = self.level_sprites
+            snapshot["enemies"] = [self._enemy_state(enemy) for enemy in enemies]
+            snapshot["collectibles"] = [i for i, col in enumerate(collectibles) if col.alive()]
+        else:
+            # Loaded chunks in load order (which is also the order of the spatial indexes).
+            snapshot["chunks"] = [[index, [self._enemy_state(enemy) for enemy in chunk.enemies]]
+                                  for index, chunk in self.level.chunks.items()]
+            snapshot["collected"] = [[index, sorted(slots)] for index, slots in self.level.collected.items()]
+        return snapshot
+
+    def restore(self, snapshot):
+        """
+        Puts the simulation back into the state captured by snapshot(). The snapshot
+        must come from a simulation of the same level.
+        """
+        self.tick = snapshot["tick"]
+        self.win = snapshot["win"]
+        self.game_over = snapshot["game_over"]
+        self.collected_count = snapshot["collected_count"]
+        self.collected_last_tick = snapshot["collected_last_tick"]
+        self.pending_inputs = []
+
+        player = self.player
+        (player.rect.x, player.rect.y, prev_x, prev_y, player.change_x, player.change_y, player.on_ground,
+         player.facing, animation, animation_start, player.health, player.invulnerable,
+         player.invulnerable_timer) = snapshot["player"]
+        player.prev_pos = (prev_x, prev_y)
+        # Set directly rather than through set_animation(), which would restart the animation.
+        player.current_animation = animation
+        player.current_frames = player.frame_tables[animation]
+        player.animation_start = animation_start
+        if animation_start is not None:
+            frames = player.current_frames[player.facing]
+            player.current_frame = ((self.tick - 1) * 1000 // TICK_RATE - animation_start) // player.frame_ms % len(frames)
+            player.image = frames[player.current_frame]
+
+        if self.enemy_system is not None:
+            self.enemy_system.tick = self.tick
+        if self.level is None:
+            platforms, enemies, collectibles = self.level_sprites
+            self._restore_enemies(enemies, snapshot["enemies"])
+            remaining = set(snapshot["collectibles"])
+            for i, col in enumerate(collectibles):
+                if i in remaining and not col.alive():
+                    self.collectible_sprites.add(col)
+                    self.all_sprites.add(col)
+                    self.collectible_hash.add(col)
+                elif i not in remaining and col.alive():
+                    col.kill()
+                    self.collectible_hash.remove(col)
+        else:
+            for chunk in self.level.chunks.values():
+                self.remove_level_sprites(chunk.platforms, chunk.enemies, chunk.collectibles)
+                for sprites in (chunk.platforms, chunk.enemies, chunk.collectibles):
+                    self.pool.release(sprites)
+            self.level.chunks.clear()
+            self.level.collected = {index: set(slots) for index, slots in snapshot["collected"]}
+            for index, enemy_states in snapshot["chunks"]:
+                chunk = self.level.chunks[index] = self.level.load_chunk(index)
+                self.add_level_sprites(chunk.platforms, chunk.enemies, chunk.collectibles)
+                self._restore_enemies(chunk.enemies, enemy_states)
+
+    def _enemy_state(self, enemy):
+        return [enemy.rect.x, enemy.prev_pos[0], enemy.direction, enemy.animation_start]
+
+    def _restore_enemies(self, enemies, states):
+        for enemy, (x, prev_x, direction, animation_start) in zip(enemies, states):
+            # Taken out of the index first: an EnemySystem writes its own state back on removal.
+            self.enemy_index.remove(enemy)
+            enemy.hitbox.x += x - enemy.rect.x
+            enemy.rect.x = x
+            enemy.prev_pos = (prev_x, enemy.rect.y)
+            enemy.direction = direction
+            enemy.facing = direction
+            # Chunks reloaded above started their walk cycle now; put back the one they had.
+            enemy.animation_start = animation_start
+            if animation_start is not None:
+                enemy.animate((self.tick - 1) * 1000 // TICK_RATE)
+            self.enemy_index.add(enemy)
+            if enemy in self.enemy_ticks:
+                self.enemy_ticks[enemy] = self.tick
+
+    def state(self):
+        """
+        Returns a plain snapshot of the simulation state.
+        """
+        player = self.player
+        if self.enemy_system is not None:
+            self.enemy_system.sync_all()
+        self.wake_enemies()
+        return {
+            "tick": self.tick,
+            "player": {
+                "x": player.rect.x,
+                "y": player.rect.y,
+                "change_x": player.change_x,
+                "change_y": player.change_y,
+                "on_ground": player.on_ground,
+                "health": player.health,
+                "invulnerable": player.invulnerable,
+            },
+            "enemies": [(enemy.rect.x, enemy.rect.y, enemy.direction) for enemy in self.enemy_sprites],
+            "collectibles": [col.rect.center for col in self.collectible_sprites],
+            "collected": self.collected,
+            "total_collectibles": self.total_collectibles,
+            "win": self.win,
+            "game_over": self.game_over,
+        }
+
+def random_inputs(seed=None, change_chance=0.05):
+    """
+    Yields an endless, reproducible stream of per-tick actions that wanders
+    left and right and jumps now and then. Useful for soak tests.
+    """
+    rng = random.Random(seed)
+    while True:
+        actions = []
+        if rng.random() < change_chance:
+            actions.append(rng.choice((LEFT, RIGHT, STOP)))
+        if rng.random() < change_chance:
+            actions.append(JUMP)
+        yield actions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the game logic headless and report its speed.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ticks", type=int, default=10000)
+    parser.add_argument("--platforms", type=int, default=10)
+    parser.add_argument("--streaming", action="store_true", help="use the endless, chunk-streamed level")
+    parser.add_argument("--vectorized", action="store_true", help="advance enemies with the NumPy EnemySystem")
+    parser.add_argument("--wake-distance", type=int, default=None,
+                        help="only update enemies within this distance of the player")
+    args = parser.parse_args()
+
+    init_headless()
+    sim = GameSimulation(seed=args.seed, inputs=random_inputs(args.seed), num_platforms=args.platforms,
+                         streaming=args.streaming, vectorized_enemies=args.vectorized,
+                         enemy_wake_distance=args.wake_distance)
+    start = time.perf_counter()
+    ticks = sim.step(args.ticks)
+    elapsed = time.perf_counter() - start
+    print(f"Simulated {ticks} ticks in {elapsed:.3f}s ({ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+    print(sim.state()["player"])
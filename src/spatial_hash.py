@@ -0,0 +1,164 @@
+# File: src/spatial_hash.py
+
+class SpatialHash:
+    """
+    A uniform-grid spatial hash for broad-phase sprite queries.
+
+    Every sprite is stored in each grid cell its rect overlaps. rect_attr picks
+    which rect is indexed, and collide_attr (rect_attr by default) which rect
+    queries test exactly. Moving sprites are kept up to date with update(),
+    which only touches the grid when the sprite has crossed into different
+    cells. A sprite that only ever moves within a known area can instead be
+    filed once under that area (e.g. enemies by their patrol_rect, tested by
+    their hitbox), so the hash needs no upkeep at all. Query results are
+    returned in insertion order, the same order a pygame Group would iterate
+    them in.
+    """
+
+    def __init__(self, cell_size=128, rect_attr="rect", collide_attr=None):
+        self.cell_size = cell_size
+        self.rect_attr = rect_attr
+        self.collide_attr = collide_attr or rect_attr
+        self.cells = {}
+        # sprite -> (first column, first row, last column, last row) of occupied cells.
+        self.sprite_cells = {}
+        # sprite -> insertion number, used to return results in a stable order.
+        self.order = {}
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.sprite_cells)
+
+    def __contains__(self, sprite):
+        return sprite in self.sprite_cells
+
+    def __iter__(self):
+        return iter(self.sprite_cells)
+
+    def cell_range(self, rect):
+        """
+        Returns the (first column, first row, last column, last row) of the cells a rect covers.
+        """
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.left + max(rect.width, 1) - 1) // size,
+                (rect.top + max(rect.height, 1) - 1) // size)
+
+    def _insert(self, sprite, cell_range):
+        x0, y0, x1, y1 = cell_range
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = {sprite}
+                else:
+                    bucket.add(sprite)
+        self.sprite_cells[sprite] = cell_range
+
+    def _discard(self, sprite, cell_range):
+        x0, y0, x1, y1 = cell_range
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.discard(sprite)
+                    if not bucket:
+                        del cells[(cx, cy)]
+
+    def add(self, *sprites):
+        """
+        Adds sprites (or iterables of sprites, such as Groups) to the hash.
+        """
+        for sprite in sprites:
+            if hasattr(sprite, self.rect_attr):
+                if sprite not in self.sprite_cells:
+                    self.order[sprite] = self.counter
+                    self.counter += 1
+                    self._insert(sprite, self.cell_range(getattr(sprite, self.rect_attr)))
+            else:
+                self.add(*sprite)
+
+    def remove(self, sprite):
+        """
+        Removes a sprite from the hash. Unknown sprites are ignored.
+        """
+        cell_range = self.sprite_cells.pop(sprite, None)
+        if cell_range is not None:
+            self._discard(sprite, cell_range)
+            del self.order[sprite]
+
+    def update(self, sprite):
+        """
+        Re-files a sprite that has moved. Cheap when it stays within the same cells.
+        """
+        old_range = self.sprite_cells.get(sprite)
+        if old_range is None:
+            return
+        new_range = self.cell_range(getattr(sprite, self.rect_attr))
+        if new_range != old_range:
+            self._discard(sprite, old_range)
+            self._insert(sprite, new_range)
+
+    def update_many(self, sprites):
+        """
+        Re-files every moved sprite in sprites. Equivalent to calling update() on
+        each, with the cell computation inlined for the common no-change case.
+        """
+        sprite_cells = self.sprite_cells
+        rect_attr = self.rect_attr
+        size = self.cell_size
+        for sprite in sprites:
+            old_range = sprite_cells.get(sprite)
+            if old_range is None:
+                continue
+            left, top, width, height = getattr(sprite, rect_attr)
+            new_range = (left // size, top // size,
+                         (left + max(width, 1) - 1) // size, (top + max(height, 1) - 1) // size)
+            if new_range != old_range:
+                self._discard(sprite, old_range)
+                self._insert(sprite, new_range)
+
+    def clear(self):
+        self.cells.clear()
+        self.sprite_cells.clear()
+        self.order.clear()
+
+    def candidates(self, rect):
+        """
+        Returns the set of sprites filed in any cell the rect overlaps (no exact test).
+        """
+        x0, y0, x1, y1 = self.cell_range(rect)
+        cells = self.cells
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        return found
+
+    def query(self, rect):
+        """
+        Returns the sprites whose collide_attr rect collides with rect, in insertion order.
+        """
+        collide_attr = self.collide_attr
+        hits = [sprite for sprite in self.candidates(rect)
+                if rect.colliderect(getattr(sprite, collide_attr))]
+        if len(hits) > 1:
+            hits.sort(key=self.order.__getitem__)
+        return hits
+
+    def collide(self, sprite, dokill=False):
+        """
+        Like pygame.sprite.spritecollide, tested against each sprite's collide_attr
+        rect (so a hash built with collide_attr="hitbox" replaces the hitbox callback).
+        With dokill, the hit sprites are killed and removed from the hash.
+        """
+        hits = self.query(sprite.rect)
+        if dokill:
+            for hit in hits:
+                hit.kill()
+                self.remove(hit)
+        return hits
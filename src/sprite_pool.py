@@ -0,0 +1,69 @@
+# File: src/sprite_pool.py
+class SpritePool:
+    """
+    Recycles sprites (Player, Enemy, Platform, Collectible) instead of rebuilding them.
+
+    acquire(cls, ...) reuses a released sprite of that class, reinitialized with
+    its reset() method (which takes the same arguments as the constructor), and
+    only constructs a new one when none is free. Reused sprites keep their
+    surfaces, rects and hitboxes, so restarting a level allocates almost nothing
+    and leaves nothing for the garbage collector. release_all() hands sprites back
+    out in the order they were first acquired, so retrying the same level gives
+    every sprite its old role and nothing needs to be redrawn.
+    """
+
+    def __init__(self):
+        # class -> released sprites ready for reuse
+        self.free = {}
+        # Sprites handed out, in acquisition order (the values are unused).
+        self.in_use = {}
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, cls, *args, **kwargs):
+        """
+        Returns a sprite of class cls initialized with the given constructor arguments.
+        """
+        free = self.free.get(cls)
+        if free:
+            sprite = free.pop()
+            sprite.reset(*args, **kwargs)
+            self.reused += 1
+        else:
+            sprite = cls(*args, **kwargs)
+            self.created += 1
+        self.in_use[sprite] = None
+        return sprite
+
+    def release(self, sprites):
+        """
+        Returns sprites to the pool, removing them from all their groups.
+        """
+        for sprite in sprites:
+            if sprite in self.in_use:
+                del self.in_use[sprite]
+                sprite.kill()
+                self.free.setdefault(type(sprite), []).append(sprite)
+
+    def release_all(self, keep=()):
+        """
+        Returns every sprite acquired from the pool, e.g. when the level they belong
+        to is over, except the sprites in keep (such as a level built in advance).
+        """
+        keep = set(keep)
+        # Released in reverse, as acquire() takes the most recently released sprite first.
+        self.release([sprite for sprite in reversed(self.in_use) if sprite not in keep])
+
+    def stats(self):
+        """
+        Returns a dictionary with the pool's counters and the number of free sprites.
+        """
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "in_use": len(self.in_use),
+            "free": sum(len(free) for free in self.free.values()),
+        }
+
+# Shared instance used by run_game, so restarts reuse the previous level's sprites.
+sprite_pool = SpritePool()
@@ -0,0 +1,56 @@
+# File: src/text_cache.py
+from collections import OrderedDict
+
+class TextCache:
+    """
+    A cache of rendered text surfaces, keyed by (font, text, color, antialias).
+
+    Rasterizing text with font.render is slow compared to blitting a surface,
+    and the HUD and menus draw the same strings every frame. Least recently
+    used entries are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        """
+        Returns the rendered surface for text. The surface is shared between callers
+        and must not be drawn on.
+        """
+        key = (font, text, tuple(color), antialias)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+    def stats(self):
+        """
+        Returns a dictionary with the cache's hit/miss counters and current size.
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+# Shared instance used by the HUD and menus.
+text_cache = TextCache()
+
+def render_text(font, text, color, antialias=True):
+    """
+    Convenience wrapper around the shared text cache.
+    """
+    return text_cache.render(font, text, color, antialias)